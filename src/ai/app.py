@@ -15,8 +15,16 @@ load_dotenv()
 # Set up authentication
 os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'chess-engine-metrics-agent')
 
-from query_processor import ChessEngineQueryProcessor
+from query_processor import ChessEngineQueryProcessor, QUERY_BATCH_MAX
 from knowledge_base import ChessEngineKnowledgeBase
+from jobs import IngestJobQueue
+from game_table import STATS_FILTERS
+from http_cache import data_etag, last_modified, is_not_modified, add_validators, compress_response
+from pagination import page_size, DOCUMENT_PAGE_SIZE, MAX_DOCUMENT_PAGE_SIZE, STORAGE_PAGE_SIZE, MAX_STORAGE_PAGE_SIZE
+
+# Fields returned for each document by /api/documents unless others are requested
+DOCUMENT_LIST_FIELDS = ['source_file', 'data_type', 'processed_at', 'total_games', 'engines', 'time_controls',
+                        'first_game_date', 'last_game_date']
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -24,13 +32,51 @@ CORS(app)  # Enable CORS for frontend communication
 
 # Initialize AI components
 try:
-    query_processor = ChessEngineQueryProcessor()
+    # One knowledge base (and one storage backend) shared by every endpoint
     knowledge_base = ChessEngineKnowledgeBase()
+    query_processor = ChessEngineQueryProcessor(knowledge_base=knowledge_base)
+    ingest_jobs = IngestJobQueue(knowledge_base)
     print("✅ AI components initialized successfully")
 except Exception as e:
     print(f"❌ Error initializing AI components: {e}")
     query_processor = None
     knowledge_base = None
+    ingest_jobs = None
+
+@app.after_request
+def compress(response):
+    """Compress large JSON responses for clients that accept it"""
+    return compress_response(response, request.accept_encodings)
+
+def _data_versioned(tag, build):
+    """Serve build() with validators from the data version, or 304 without building when the client's copy is current
+
+    When the data version cannot be read the response is built as usual,
+    without validators.
+    """
+    try:
+        stamp = knowledge_base.data_version_stamp()
+    except Exception as e:
+        print(f"Data version lookup failed, serving without validators: {e}")
+        stamp = None
+    if not stamp:
+        return build()
+    
+    etag = data_etag(tag, stamp)
+    modified = last_modified(stamp)
+    if is_not_modified(request, etag, modified):
+        return add_validators(app.response_class(status=304), etag, modified)
+    
+    response = build()
+    if response.status_code != 200:
+        return response
+    return add_validators(response, etag, modified)
+
+def _content_validated(response):
+    """Attach a content hash ETag, answering 304 when it matches the client's copy"""
+    response.add_etag(weak=True)
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/', methods=['GET'])
 def health_check():
@@ -51,64 +97,138 @@ def process_query():
                 'success': False,
                 'error': 'AI service not available'
             }), 500
-
+        
         data = request.get_json()
         if not data or 'query' not in data:
             return jsonify({
                 'success': False,
                 'error': 'Query is required'
             }), 400
-
+        
         query = data['query']
         user_id = data.get('user_id', 'anonymous')
-
+        
         # Process the query
         result = query_processor.process_query(query, user_id)
-
+        
         return jsonify(result)
-
+    
     except Exception as e:
         return jsonify({
             'success': False,
             'error': f'Query processing failed: {str(e)}'
         }), 500
 
+@app.route('/api/query/batch', methods=['POST'])
+def process_query_batch():
+    """Answer several natural language queries with one shared data retrieval"""
+    try:
+        if not query_processor:
+            return jsonify({
+                'success': False,
+                'error': 'AI service not available'
+            }), 500
+        
+        data = request.get_json()
+        queries = data.get('queries') if data else None
+        if not isinstance(queries, list) or not queries:
+            return jsonify({
+                'success': False,
+                'error': 'queries must be a non-empty list'
+            }), 400
+        
+        if not all(isinstance(query, str) and query.strip() for query in queries):
+            return jsonify({
+                'success': False,
+                'error': 'Each query must be a non-empty string'
+            }), 400
+        
+        if len(queries) > QUERY_BATCH_MAX:
+            return jsonify({
+                'success': False,
+                'error': f'At most {QUERY_BATCH_MAX} queries per batch'
+            }), 400
+        
+        user_id = data.get('user_id', 'anonymous')
+        
+        # Answers come back in query order
+        result = query_processor.process_queries(queries, user_id)
+        
+        return jsonify(result)
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Batch query processing failed: {str(e)}'
+        }), 500
+
 @app.route('/api/ingest', methods=['POST'])
 def ingest_data():
-    """Ingest data for knowledge base"""
+    """Ingest data for knowledge base
+
+    Runs as a background job and returns its ID (202); pass "wait": true to
+    ingest within the request and get the result directly.
+    """
     try:
         if not knowledge_base:
             return jsonify({
                 'success': False,
                 'error': 'Knowledge base not available'
             }), 500
-
+        
         data = request.get_json()
         if not data or 'content' not in data or 'type' not in data:
             return jsonify({
                 'success': False,
                 'error': 'Content and type are required'
             }), 400
-
+        
+        if not knowledge_base.db:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection not available'
+            }), 503
+        
         content = data['content']
         data_type = data['type']
         metadata = data.get('metadata', {})
-
+        
         # Process based on data type
         if data_type == 'pgn':
-            result = knowledge_base.ingest_pgn_data(content, metadata)
+            analyze_moves = bool(data.get('analyze_moves', False))
+            workers = _positive_int(data.get('workers'), 'workers')
+            ingest = lambda progress: knowledge_base.ingest_pgn_data(content, metadata, analyze_moves,
+                                                                     workers, progress)
         elif data_type == 'json':
-            result = knowledge_base.ingest_json_data(content, metadata)
+            ingest = lambda progress: knowledge_base.ingest_json_data(content, metadata)
         elif data_type == 'markdown':
-            result = knowledge_base.ingest_markdown_data(content, metadata)
+            ingest = lambda progress: knowledge_base.ingest_markdown_data(content, metadata)
         else:
             return jsonify({
                 'success': False,
                 'error': f'Unsupported data type: {data_type}'
             }), 400
-
-        return jsonify(result)
-
+        
+        if data.get('wait') or not ingest_jobs:
+            return jsonify(ingest(None))
+        
+        def run(progress):
+            result = ingest(progress)
+            progress.increment('files_done' if result.get('success') else 'files_failed')
+            return result
+        
+        job = ingest_jobs.submit(data_type, {
+            'fileName': metadata.get('fileName', 'unknown'),
+            'bytes': len(content),
+            'analyze_moves': bool(data.get('analyze_moves', False))
+        }, run)
+        return jsonify(_job_accepted(job)), 202
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -124,19 +244,199 @@ def get_performance_summary():
                 'success': False,
                 'error': 'Knowledge base not available'
             }), 500
-
+        
         engine_name = request.args.get('engine')
-        summary = knowledge_base.get_engine_performance_summary(engine_name)
+        time_control = request.args.get('time_control')
+        
+        # The summary only changes when an ingest moves the data version
+        return _data_versioned('performance', lambda: jsonify({
+            'success': True,
+            'data': knowledge_base.get_engine_performance_summary(engine_name, time_control)
+        }))
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to get performance summary: {str(e)}'
+        }), 500
 
+@app.route('/api/documents', methods=['GET'])
+def list_documents():
+    """List knowledge base documents, newest first, one page at a time"""
+    try:
+        if not knowledge_base:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        # engine may be repeated to match documents with any of the engines
+        filters = {
+            'data_type': request.args.get('data_type'),
+            'engine': request.args.getlist('engine'),
+            'time_control': request.args.get('time_control'),
+            'date_from': request.args.get('date_from'),
+            'date_to': request.args.get('date_to')
+        }
+        filters = {name: value for name, value in filters.items() if value}
+        fields = request.args.get('fields')
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else DOCUMENT_LIST_FIELDS
+        size = page_size(request.args.get('page_size'), DOCUMENT_PAGE_SIZE, MAX_DOCUMENT_PAGE_SIZE)
+        page = knowledge_base.query_knowledge_base_page(filters, fields, size, request.args.get('page_token'))
+        
         return jsonify({
             'success': True,
-            'data': summary
+            'documents': page['documents'],
+            'count': len(page['documents']),
+            'next_page_token': page['next_page_token']
+        })
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to list documents: {str(e)}'
+        }), 500
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Group-by statistics over ingested games"""
+    try:
+        if not knowledge_base:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        group_by = [dimension for dimension in request.args.get('group_by', '').split(',') if dimension]
+        filters = {key: request.args.get(key) for key in STATS_FILTERS if request.args.get(key)}
+        stats = knowledge_base.get_stats(group_by, filters)
+        
+        return jsonify({
+            'success': 'error' not in stats,
+            'data': stats
         })
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to compute stats: {str(e)}'
+        }), 500
 
+@app.route('/api/ratings', methods=['GET'])
+def get_engine_ratings():
+    """Bradley-Terry ratings with error bars from head-to-head results"""
+    try:
+        if not knowledge_base:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        min_games = _positive_int(request.args.get('min_games'), 'min_games')
+        ratings = knowledge_base.get_engine_ratings(request.args.get('engine'), min_games)
+        
+        return jsonify({
+            'success': 'error' not in ratings,
+            'data': ratings
+        })
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
-            'error': f'Failed to get performance summary: {str(e)}'
+            'error': f'Failed to compute ratings: {str(e)}'
+        }), 500
+
+@app.route('/api/head-to-head', methods=['GET'])
+def get_head_to_head():
+    """Direct results between two engines with a color split"""
+    try:
+        if not knowledge_base:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        engine_name = request.args.get('engine')
+        opponent_name = request.args.get('opponent')
+        if not engine_name or not opponent_name:
+            return jsonify({
+                'success': False,
+                'error': 'engine and opponent are required'
+            }), 400
+        
+        head_to_head = knowledge_base.get_head_to_head(engine_name, opponent_name)
+        
+        return jsonify({
+            'success': 'error' not in head_to_head,
+            'data': head_to_head
+        })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to load head-to-head results: {str(e)}'
+        }), 500
+
+@app.route('/api/trends', methods=['GET'])
+def get_engine_trend():
+    """Historical trend for an engine from pre-bucketed daily/weekly results"""
+    try:
+        if not knowledge_base:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        engine_name = request.args.get('engine')
+        if not engine_name:
+            return jsonify({
+                'success': False,
+                'error': 'engine is required'
+            }), 400
+        
+        trend = knowledge_base.get_engine_trend(
+            engine_name,
+            bucket=request.args.get('bucket', 'week'),
+            window_days=int(request.args.get('window', 28)),
+            rolling=int(request.args.get('rolling', 4)),
+            date_from=request.args.get('date_from'),
+            date_to=request.args.get('date_to')
+        )
+        
+        return jsonify({
+            'success': 'error' not in trend,
+            'data': trend
+        })
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to get engine trend: {str(e)}'
         }), 500
 
 @app.route('/api/suggestions', methods=['GET'])
@@ -148,15 +448,15 @@ def get_query_suggestions():
                 'success': False,
                 'error': 'Query processor not available'
             }), 500
-
+        
         context = request.args.get('context')
         suggestions = query_processor.get_query_suggestions(context)
-
-        return jsonify({
+        
+        return _content_validated(jsonify({
             'success': True,
             'suggestions': suggestions
-        })
-
+        }))
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -165,23 +465,31 @@ def get_query_suggestions():
 
 @app.route('/api/storage/list', methods=['GET'])
 def list_storage_files():
-    """List files in Firebase Storage"""
+    """List files in Firebase Storage, one page at a time"""
     try:
         if not knowledge_base:
             return jsonify({
                 'success': False,
                 'error': 'Knowledge base not available'
             }), 500
-
+        
         prefix = request.args.get('prefix', '')
-        files = knowledge_base.list_storage_files(prefix)
-
-        return jsonify({
+        size = page_size(request.args.get('page_size'), STORAGE_PAGE_SIZE, MAX_STORAGE_PAGE_SIZE)
+        page = knowledge_base.list_storage_files_page(prefix, size, request.args.get('page_token'))
+        
+        # Uploads do not move the data version, so the listing is validated by its content
+        return _content_validated(jsonify({
             'success': True,
-            'files': files,
-            'count': len(files)
-        })
-
+            'files': page['files'],
+            'count': len(page['files']),
+            'next_page_token': page['next_page_token']
+        }))
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
@@ -190,30 +498,171 @@ def list_storage_files():
 
 @app.route('/api/storage/ingest', methods=['POST'])
 def auto_ingest_from_storage():
-    """Automatically ingest data from Firebase Storage"""
+    """Automatically ingest data from Firebase Storage
+
+    Runs as a background job and returns its ID (202); pass "wait": true to
+    ingest within the request and get the result directly.
+    """
     try:
         if not knowledge_base:
             return jsonify({
                 'success': False,
                 'error': 'Knowledge base not available'
             }), 500
-
+        
+        if not knowledge_base.db:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection not available'
+            }), 503
+        
         data = request.get_json()
         prefix = data.get('prefix', '') if data else ''
+        force = bool(data.get('force', False)) if data else False
+        
+        if (data and data.get('wait')) or not ingest_jobs:
+            result = knowledge_base.auto_ingest_from_storage(prefix, force)
+            return jsonify({
+                'success': True,
+                'result': result
+            })
+        
+        job = ingest_jobs.submit('storage', {'prefix': prefix, 'force': force},
+                                 lambda progress: knowledge_base.auto_ingest_from_storage(prefix, force, progress))
+        return jsonify(_job_accepted(job)), 202
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Auto-ingest failed: {str(e)}'
+        }), 500
 
-        result = knowledge_base.auto_ingest_from_storage(prefix)
+@app.route('/api/aggregates/rebuild', methods=['POST'])
+def rebuild_aggregates():
+    """Recompute the performance, trend, head-to-head and time control aggregates
 
+    Runs as a background job and returns its ID (202); pass "wait": true to
+    rebuild within the request and get the result directly.
+    """
+    try:
+        if not knowledge_base:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        if not knowledge_base.db:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection not available'
+            }), 503
+        
+        data = request.get_json(silent=True)
+        if (data and data.get('wait')) or not ingest_jobs:
+            result = knowledge_base.rebuild_aggregates()
+            return jsonify(result), 200 if result['success'] else 500
+        
+        job = ingest_jobs.submit('rebuild', {}, lambda progress: knowledge_base.rebuild_aggregates())
+        return jsonify(_job_accepted(job)), 202
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Aggregate rebuild failed: {str(e)}'
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_ingest_job(job_id):
+    """Status, progress counters, throughput and result of an ingestion job"""
+    try:
+        if not ingest_jobs:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        if not knowledge_base.db:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection not available'
+            }), 503
+        
+        job = ingest_jobs.get(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': f'Job not found: {job_id}'
+            }), 404
+        
         return jsonify({
             'success': True,
-            'result': result
+            'job': job
         })
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f'Failed to load job: {str(e)}'
+        }), 500
 
+@app.route('/api/jobs', methods=['GET'])
+def list_ingest_jobs():
+    """Most recent ingestion jobs"""
+    try:
+        if not ingest_jobs:
+            return jsonify({
+                'success': False,
+                'error': 'Knowledge base not available'
+            }), 500
+        
+        if not knowledge_base.db:
+            return jsonify({
+                'success': False,
+                'error': 'Database connection not available'
+            }), 503
+        
+        jobs = ingest_jobs.list(_positive_int(request.args.get('limit'), 'limit', 20))
+        
+        return jsonify({
+            'success': True,
+            'jobs': jobs,
+            'count': len(jobs)
+        })
+    
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
     except Exception as e:
         return jsonify({
             'success': False,
-            'error': f'Auto-ingest failed: {str(e)}'
+            'error': f'Failed to list jobs: {str(e)}'
         }), 500
 
+def _positive_int(value, name, default=None):
+    """Parse an optional positive integer request parameter, raising ValueError for anything else"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        raise ValueError(f'{name} must be a positive integer')
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be a positive integer')
+    if number < 1 or (isinstance(value, float) and value != number):
+        raise ValueError(f'{name} must be a positive integer')
+    return number
+
+def _job_accepted(job):
+    """Response body for a newly queued ingestion job"""
+    return {
+        'success': True,
+        'job_id': job['job_id'],
+        'status': job['status'],
+        'status_url': f"/api/jobs/{job['job_id']}"
+    }
+
 @app.route('/api/storage/load', methods=['POST'])
 def load_file_from_storage():
     """Load a specific file from Firebase Storage"""
@@ -223,30 +672,30 @@ def load_file_from_storage():
                 'success': False,
                 'error': 'Knowledge base not available'
             }), 500
-
+        
         data = request.get_json()
         if not data or 'file_path' not in data:
             return jsonify({
                 'success': False,
                 'error': 'file_path is required'
             }), 400
-
+        
         file_path = data['file_path']
         content = knowledge_base.load_data_from_storage(file_path)
-
+        
         if content is None:
             return jsonify({
                 'success': False,
                 'error': f'Failed to load file: {file_path}'
             }), 404
-
+        
         return jsonify({
             'success': True,
             'file_path': file_path,
             'content_length': len(content),
             'content_preview': content[:500] + ('...' if len(content) > 500 else '')
         })
-
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -275,5 +724,6 @@ if __name__ == '__main__':
     print(f"🚀 Starting Chess Engine Metrics AI on port {port}")
     print(f"🔗 Health check: http://localhost:{port}/")
     print(f"🤖 Query API: http://localhost:{port}/api/query")
+    print(f"📦 Batch Query API: http://localhost:{port}/api/query/batch")
     
     app.run(host='0.0.0.0', port=port, debug=debug)
\ No newline at end of file
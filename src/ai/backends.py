@@ -0,0 +1,195 @@
+"""
+Chess Engine Metrics AI - Storage Backends
+Pluggable document store and bucket behind the knowledge base, shared per worker
+"""
+
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Dict, Optional, Tuple
+from google.cloud import firestore
+from google.cloud import storage
+
+# Connections kept open in the Storage HTTP session pool
+STORAGE_HTTP_POOL_SIZE = int(os.getenv('STORAGE_HTTP_POOL_SIZE', 32))
+
+# Run a read-only connectivity check when clients are first created
+CONNECTION_CHECK = os.getenv('KB_CONNECTION_CHECK', 'False').lower() == 'true'
+
+# Which backend the knowledge base runs on: 'firestore' or 'local'
+KB_BACKEND = os.getenv('KB_BACKEND', 'firestore').lower()
+
+# Directory holding the local backend's SQLite database and bucket folder
+KB_LOCAL_PATH = os.getenv('KB_LOCAL_PATH', 'local_kb')
+
+
+class KnowledgeBaseBackend(ABC):
+    """Storage behind the knowledge base
+
+    db is a document store exposing the Firestore client API subset the
+    knowledge base uses (collections, documents, batches, get_all and
+    where/order_by/select/limit queries); bucket exposes the Cloud Storage
+    bucket subset (blob, list_blobs and blob download/open). Either is None
+    when the backend is unavailable.
+    """
+    
+    name = 'abstract'
+    
+    @property
+    @abstractmethod
+    def db(self):
+        """Document store, or None when unavailable"""
+    
+    @property
+    @abstractmethod
+    def storage_client(self):
+        """Storage client, or None when the backend has none"""
+    
+    @property
+    @abstractmethod
+    def bucket(self):
+        """Bucket, or None when unavailable"""
+
+
+class FirestoreBackend(KnowledgeBaseBackend):
+    """Creates Firestore and Storage clients on first use and shares them
+
+    Firestore multiplexes requests over the client's single gRPC channel and
+    Storage requests go through one pooled HTTP session, so every knowledge
+    base and query processor in the process reuses the same connections.
+    """
+    
+    name = 'firestore'
+    
+    def __init__(self, project_id: str, bucket_name: Optional[str] = None,
+                 connection_check: bool = CONNECTION_CHECK):
+        self.project_id = project_id
+        self.bucket_name = bucket_name or os.getenv('FIREBASE_STORAGE_BUCKET', f"{project_id}.firebasestorage.app")
+        self.connection_check = connection_check
+        
+        self._lock = threading.Lock()
+        self._initialized = False
+        self._db = None
+        self._storage_client = None
+        self._bucket = None
+    
+    @property
+    def db(self) -> Optional[firestore.Client]:
+        """Shared Firestore client, or None when Firebase is unavailable"""
+        self._ensure_clients()
+        return self._db
+    
+    @property
+    def storage_client(self) -> Optional[storage.Client]:
+        """Shared Storage client, or None when Firebase is unavailable"""
+        self._ensure_clients()
+        return self._storage_client
+    
+    @property
+    def bucket(self) -> Optional[storage.Bucket]:
+        """Shared handle to the Firebase Storage bucket, or None when unavailable"""
+        self._ensure_clients()
+        return self._bucket
+    
+    def _ensure_clients(self) -> None:
+        """Create the clients once, falling back to None if Firebase is unreachable"""
+        if self._initialized:
+            return
+        
+        with self._lock:
+            if self._initialized:
+                return
+            
+            try:
+                # Use Application Default Credentials (Firebase CLI authentication)
+                self._db = firestore.Client(project=self.project_id)
+                self._storage_client = storage.Client(project=self.project_id, _http=self._pooled_session())
+                self._bucket = self._storage_client.bucket(self.bucket_name)
+                
+                if self.connection_check:
+                    self.check_connection()
+                print(f"✅ Connected to Firebase project: {self.project_id}")
+            
+            except Exception as e:
+                print(f"⚠️ Firebase connection issue: {e}")
+                print("💡 Ensure you're authenticated with: firebase login")
+                print("Using fallback mode - some features may be limited")
+                self._db = None
+                self._storage_client = None
+                self._bucket = None
+            
+            self._initialized = True
+    
+    def _pooled_session(self):
+        """Authorized HTTP session with a connection pool sized for concurrent downloads"""
+        import google.auth
+        from google.auth.transport.requests import AuthorizedSession
+        from requests.adapters import HTTPAdapter
+        
+        credentials, _ = google.auth.default(scopes=storage.Client.SCOPE)
+        session = AuthorizedSession(credentials)
+        adapter = HTTPAdapter(pool_connections=STORAGE_HTTP_POOL_SIZE, pool_maxsize=STORAGE_HTTP_POOL_SIZE)
+        session.mount('https://', adapter)
+        return session
+    
+    def check_connection(self) -> None:
+        """Read-only check that Firestore and Storage are reachable"""
+        if self._db:
+            self._db.collection('_test').document('connection').get()
+        
+        if self._bucket:
+            self._bucket.exists()
+
+
+class LocalBackend(KnowledgeBaseBackend):
+    """SQLite document store plus a directory standing in for the bucket
+
+    Needs no network or credentials, so ingestion and queries run at local
+    disk speed on build boxes and in benchmarks.
+    """
+    
+    name = 'local'
+    
+    def __init__(self, root: str = KB_LOCAL_PATH):
+        from local_backend import LocalDocumentStore, LocalBucket
+        
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._db = LocalDocumentStore(os.path.join(root, 'knowledge_base.sqlite3'))
+        self._bucket = LocalBucket(os.path.join(root, 'bucket'))
+        print(f"✅ Using local knowledge base at: {os.path.abspath(root)}")
+    
+    @property
+    def db(self):
+        return self._db
+    
+    @property
+    def storage_client(self):
+        return None
+    
+    @property
+    def bucket(self):
+        return self._bucket
+
+
+_backends: Dict[Tuple[str, int], KnowledgeBaseBackend] = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend(project_id: str, backend_name: Optional[str] = None) -> KnowledgeBaseBackend:
+    """Return the process-wide backend for a project, chosen by KB_BACKEND by default
+
+    Backends are keyed by process ID as well, so workers forked from a
+    preloaded app never reuse a gRPC channel or SQLite handle opened in the parent.
+    """
+    backend_name = (backend_name or KB_BACKEND).lower()
+    key = (f"{backend_name}:{project_id}", os.getpid())
+    with _backends_lock:
+        if key not in _backends:
+            if backend_name == 'local':
+                _backends[key] = LocalBackend()
+            elif backend_name == 'firestore':
+                _backends[key] = FirestoreBackend(project_id)
+            else:
+                raise ValueError(f"Unknown knowledge base backend: {backend_name}")
+        return _backends[key]
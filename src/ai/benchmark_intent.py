@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Benchmark query intent classification cost at high QPS
+"""
+
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from intent_matcher import IntentMatcher
+
+ENGINE_NAMES = ['V7P3R', 'SlowMate', 'C0BR4', 'COBRA']
+
+QUERIES = [
+    "How has V7P3R improved over time?",
+    "Which engine performs best in blitz?",
+    "Compare SlowMate vs C0BR4 performance",
+    "What factors influence engine performance?",
+    "What caused the recent performance drop?",
+    "Which engine has the strongest tactical play?",
+    "How do different time controls affect performance?",
+    "What are the key differences between engines?",
+    "How has V7P3R improved since v10.8?",
+    "Show COBRA results from last week"
+]
+
+def run(classify, queries, label):
+    """Time classify over queries and print per-query cost and throughput"""
+    start = time.perf_counter()
+    for query in queries:
+        classify(query)
+    elapsed = time.perf_counter() - start
+    
+    per_query_us = elapsed / len(queries) * 1e6
+    print(f"   {label:<32} {per_query_us:8.2f} µs/query   {len(queries) / elapsed:12,.0f} queries/s")
+    return per_query_us
+
+def run_threaded(classify, queries, threads, label):
+    """Time classify across a thread pool, as concurrent requests would call it"""
+    chunks = [queries[index::threads] for index in range(threads)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(lambda chunk: [classify(query) for query in chunk], chunks))
+    elapsed = time.perf_counter() - start
+    print(f"   {label:<32} {elapsed / len(queries) * 1e6:8.2f} µs/query   {len(queries) / elapsed:12,.0f} queries/s")
+
+def main(iterations=20000):
+    print(f"⚡ Intent classification benchmark ({iterations:,} queries per run)")
+    
+    repeated = [QUERIES[index % len(QUERIES)] for index in range(iterations)]
+    # A unique suffix per query defeats memoization, measuring the scan itself
+    unique = [f"{query} #{index}" for index, query in enumerate(repeated)]
+    
+    print("\n🔁 Repeated dashboard questions (memoized):")
+    run(IntentMatcher(ENGINE_NAMES).match, repeated, "single thread")
+    run_threaded(IntentMatcher(ENGINE_NAMES).match, repeated, 8, "8 threads")
+    
+    print("\n🆕 Unique queries (single regex pass):")
+    run(IntentMatcher(ENGINE_NAMES, memo_size=0).match, unique, "single thread")
+    run_threaded(IntentMatcher(ENGINE_NAMES, memo_size=0).match, unique, 8, "8 threads")
+    
+    print("\n🔍 Sample intents:")
+    matcher = IntentMatcher(ENGINE_NAMES)
+    for query in QUERIES[:4]:
+        intent = matcher.match(query)
+        print(f"   {query!r} -> {intent['type']}, engines={intent['engines']}, "
+              f"aspect={intent['performance_aspect']}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
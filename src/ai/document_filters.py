@@ -0,0 +1,102 @@
+"""
+Chess Engine Metrics AI - Document Filters
+Engine, time control and date fields recorded on PGN documents for server-side filtered queries
+"""
+
+from datetime import date
+from typing import Dict, List, Any
+from time_controls import time_control_category
+
+# Filters query_knowledge_base resolves with indexed queries instead of in Python
+DOCUMENT_FILTERS = ['engine', 'time_control', 'date_from', 'date_to']
+
+# Firestore's limit on the values of one array_contains_any filter
+MAX_FILTER_ENGINES = 30
+
+# Joins an engine and a time control category into one engine_time_controls entry; Firestore
+# allows a single array_contains per query, so filtering by both needs the combined value
+ENGINE_TIME_CONTROL_SEPARATOR = '|'
+
+
+def engine_time_control_key(engine: str, category: str) -> str:
+    """Combined engine and time control value stored in engine_time_controls"""
+    return f"{engine}{ENGINE_TIME_CONTROL_SEPARATOR}{category}"
+
+
+def document_filter_fields(time_control_stats: Dict[str, Dict[str, List[int]]],
+                           engine_daily: Dict[str, Dict[str, List[int]]]) -> Dict[str, Any]:
+    """Filterable fields of a PGN document, derived from its per-engine contributions
+
+    Every game lands in time_control_stats, so its keys are the engines
+    present; the dated games in engine_daily give the date range covered.
+    Documents without dated games get no range, so date filters skip them.
+    """
+    dates = sorted({day for days in engine_daily.values() for day in days})
+    return {
+        'engines': sorted(time_control_stats),
+        'time_controls': sorted({category for categories in time_control_stats.values() for category in categories}),
+        'engine_time_controls': sorted(
+            engine_time_control_key(engine, category)
+            for engine, categories in time_control_stats.items() for category in categories
+        ),
+        'first_game_date': dates[0] if dates else None,
+        'last_game_date': dates[-1] if dates else None
+    }
+
+
+def normalize_document_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Validate the engine, time control and date filters that are set
+
+    engine may be one name or a list of names, matching documents with any
+    of them. Raises ValueError for too many engines, an unknown time control
+    category or a date that is not an ISO date.
+    """
+    normalized = {}
+    engines = filters.get('engine')
+    if engines:
+        engines = [engines] if isinstance(engines, str) else engines
+        if not isinstance(engines, (list, tuple)) or not all(isinstance(engine, str) for engine in engines):
+            raise ValueError("engine must be a name or a list of names")
+        engines = list(dict.fromkeys(engines))
+        if len(engines) > MAX_FILTER_ENGINES:
+            raise ValueError(f"At most {MAX_FILTER_ENGINES} engines can be filtered on at once")
+        normalized['engine'] = engines
+    if filters.get('time_control'):
+        if not isinstance(filters['time_control'], str):
+            raise ValueError(f"time_control must be a category name, got {filters['time_control']!r}")
+        normalized['time_control'] = time_control_category(filters['time_control'])
+    for name in ('date_from', 'date_to'):
+        if filters.get(name):
+            if not isinstance(filters[name], str):
+                raise ValueError(f"{name} must be an ISO date (YYYY-MM-DD), got {filters[name]!r}")
+            normalized[name] = date.fromisoformat(filters[name]).isoformat()
+    return normalized
+
+
+def apply_document_filters(query, filters: Dict[str, Any]):
+    """Narrow a knowledge base query by normalized engine, time control and game date filters
+
+    A document matches a date range when the games it covers overlap it.
+    Only PGN documents carry these fields.
+    """
+    engines = filters.get('engine')
+    time_control = filters.get('time_control')
+    if engines and time_control:
+        field, values = 'engine_time_controls', [engine_time_control_key(engine, time_control) for engine in engines]
+    elif engines:
+        field, values = 'engines', engines
+    elif time_control:
+        field, values = 'time_controls', [time_control]
+    else:
+        field, values = None, []
+    
+    if len(values) == 1:
+        query = query.where(field, 'array_contains', values[0])
+    elif values:
+        query = query.where(field, 'array_contains_any', values)
+    
+    if filters.get('date_from'):
+        query = query.where('last_game_date', '>=', filters['date_from'])
+    if filters.get('date_to'):
+        query = query.where('first_game_date', '<=', filters['date_to'])
+    return query
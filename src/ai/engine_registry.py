@@ -0,0 +1,88 @@
+"""
+Chess Engine Metrics AI - Engine Registry
+Known engine names with a normalized alias index for constant-time resolution
+"""
+
+import re
+import hashlib
+from typing import Dict, List, Iterable
+
+# Trailing version after a separator: "V7P3R v11.0", "COBRA 2.0", "Stockfish_16", "Engine-1.2b"
+VERSION_SUFFIX = re.compile(r'[\s_\-]+v?\d+(?:\.\d+)*[a-z]*$', re.IGNORECASE)
+
+# Digits commonly substituted for letters in engine names (C0BR4 -> COBRA)
+LEET_DIGITS = str.maketrans('01345', 'oieas')
+
+# Aliases shorter than this are not matched inside free-text queries
+MIN_ALIAS_LENGTH = 3
+
+
+def base_name(name: str) -> str:
+    """Engine name without its version suffix"""
+    return VERSION_SUFFIX.sub('', name.strip()) or name.strip()
+
+
+def engine_document_id(engine: str) -> str:
+    """Firestore-safe document ID for an engine name"""
+    return hashlib.sha1(engine.encode('utf-8')).hexdigest()
+
+
+def family_key(name: str) -> str:
+    """Normalized key shared by every version and spelling of an engine"""
+    folded = base_name(name).lower().translate(LEET_DIGITS)
+    return re.sub(r'[^a-z0-9]', '', folded)
+
+
+class EngineRegistry:
+    """Engine names seen in ingested games, indexed by exact name and family
+
+    Versions of an engine ("V7P3R v10.8", "V7P3R v11.0") and digit spellings
+    ("COBRA 2.0", "C0BR4") share a family key, so any of their spellings
+    resolves to all of them with a dictionary lookup.
+    """
+    
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self._exact: Dict[str, str] = {}
+        self._families: Dict[str, List[str]] = {}
+        for name in names:
+            self.add(name)
+    
+    def add(self, name: str) -> None:
+        """Register an engine name"""
+        if not name or name.lower() in self._exact:
+            return
+        self.names.append(name)
+        self._exact[name.lower()] = name
+        self._families.setdefault(family_key(name), []).append(name)
+    
+    def resolve(self, text: str) -> List[str]:
+        """Engine names a name or alias refers to: the exact name if known, else its whole family"""
+        exact = self._exact.get(text.strip().lower())
+        if exact:
+            return [exact]
+        return list(self._families.get(family_key(text), []))
+    
+    def aliases(self) -> Dict[str, List[str]]:
+        """Lowercase spellings to look for in queries, mapped to the engine names they mean
+
+        Each engine is found by its full name, and each family by the
+        versionless spelling of any of its members, matching resolve().
+        """
+        aliases: Dict[str, List[str]] = {}
+        for name in self.names:
+            if len(name) >= MIN_ALIAS_LENGTH:
+                aliases.setdefault(name.lower(), []).append(name)
+        for members in self._families.values():
+            for spelling in {base_name(member).lower() for member in members}:
+                # A spelling that is itself an engine's full name keeps meaning just that engine
+                if len(spelling) >= MIN_ALIAS_LENGTH and spelling not in self._exact:
+                    targets = aliases.setdefault(spelling, [])
+                    targets.extend(member for member in members if member not in targets)
+        return aliases
+    
+    def __contains__(self, name: str) -> bool:
+        return name.lower() in self._exact
+    
+    def __len__(self) -> int:
+        return len(self.names)
@@ -0,0 +1,146 @@
+"""
+Chess Engine Metrics AI - Game Store
+Per-game records kept in a dedicated collection and written in batches
+"""
+
+import uuid
+import hashlib
+from typing import Dict, Optional, Any, Iterable, Iterator
+
+GAMES_COLLECTION = 'games'
+
+# Firestore caps a write batch at 500 operations
+FIRESTORE_MAX_BATCH_WRITES = 500
+
+# Game records committed per batch
+GAMES_BATCH_SIZE = FIRESTORE_MAX_BATCH_WRITES
+
+
+def game_id(document_id: str, game_index: int, generation: Optional[str] = None) -> str:
+    """Deterministic game document ID within one generation of a document's games"""
+    key = f"{document_id}:{generation}:{game_index}" if generation else f"{document_id}:{game_index}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def committed_games(records: Iterable[Dict[str, Any]], generations: Dict[str, Optional[str]]) -> Iterator[Dict[str, Any]]:
+    """Game records belonging to the current generation of a written knowledge base document
+
+    generations maps each document ID to its games_generation. Games of a
+    document that was never written, or of a generation it has since
+    replaced or not yet switched to, are skipped.
+    """
+    for record in records:
+        document_id = record.get('source_document')
+        if document_id in generations and record.get('games_generation') == generations[document_id]:
+            yield record
+
+
+def normalize_pgn_date(pgn_date: str) -> Optional[str]:
+    """Convert a PGN date (YYYY.MM.DD) to ISO format, or None when any part is unknown"""
+    parts = (pgn_date or '').split('.')
+    if len(parts) != 3 or not all(part.isdigit() for part in parts):
+        return None
+    return f"{parts[0]}-{parts[1]}-{parts[2]}"
+
+
+class GameBatchWriter:
+    """Streams game records for one knowledge base document into the games collection
+
+    Records are committed every batch_size games so memory stays bounded.
+    Each writer stores its games under a fresh generation, recorded on the
+    document as games_generation, so re-ingesting a document never touches
+    the games its committed version points at. Callers either commit the
+    document and then delete the games of its other generations
+    (delete_document_games with keep_generation), or call discard() when
+    the document is not written. Committed games are counted on an
+    optional job progress object.
+    """
+    
+    def __init__(self, db, document_id: str, source_file: str, batch_size: int = GAMES_BATCH_SIZE,
+                 progress=None):
+        self.db = db
+        self.document_id = document_id
+        self.source_file = source_file
+        self.generation = uuid.uuid4().hex
+        self.batch_size = batch_size
+        self.progress = progress
+        self.games_written = 0
+        self._batch = None
+        self._pending = 0
+    
+    def add(self, game: Dict[str, Any]) -> None:
+        """Queue one game record, committing when the batch is full"""
+        if self._batch is None:
+            self._batch = self.db.batch()
+        
+        record = dict(game)
+        record.update({
+            'source_document': self.document_id,
+            'source_file': self.source_file,
+            'game_index': self.games_written,
+            'games_generation': self.generation,
+            'engines': [game['white'], game['black']],
+            'game_date': normalize_pgn_date(game.get('date'))
+        })
+        
+        doc_ref = self.db.collection(GAMES_COLLECTION).document(
+            game_id(self.document_id, self.games_written, self.generation))
+        self._batch.set(doc_ref, record)
+        self.games_written += 1
+        self._pending += 1
+        
+        if self._pending >= self.batch_size:
+            self._flush()
+    
+    def close(self) -> int:
+        """Commit remaining records and return the number of games written"""
+        self._flush()
+        return self.games_written
+    
+    def discard(self) -> None:
+        """Drop queued records and delete the committed ones of a generation that will not be written"""
+        self._batch = None
+        self._pending = 0
+        try:
+            delete_document_games(self.db, self.document_id, generation=self.generation, batch_size=self.batch_size)
+        except Exception as e:
+            print(f"❌ Failed to remove unwritten games of document {self.document_id}: {e}")
+    
+    def _flush(self) -> None:
+        """Commit the current batch"""
+        if self._batch is not None and self._pending:
+            self._batch.commit()
+            if self.progress is not None:
+                self.progress.increment('games', self._pending)
+        self._batch = None
+        self._pending = 0
+
+
+def delete_document_games(db, document_id: str, generation: Optional[str] = None,
+                          keep_generation: Optional[str] = None, batch_size: int = GAMES_BATCH_SIZE) -> int:
+    """Delete a document's games of one generation, or of every generation but keep_generation
+
+    Games stored before generations existed have none and only match
+    keep_generation deletes. Returns the number deleted.
+    """
+    query = db.collection(GAMES_COLLECTION).where('source_document', '==', document_id)
+    if generation:
+        query = query.where('games_generation', '==', generation)
+    
+    batch = db.batch()
+    pending = 0
+    deleted = 0
+    for doc in query.select(['games_generation']).stream():
+        if keep_generation and doc.to_dict().get('games_generation') == keep_generation:
+            continue
+        batch.delete(doc.reference)
+        pending += 1
+        deleted += 1
+        if pending >= batch_size:
+            batch.commit()
+            batch = db.batch()
+            pending = 0
+    
+    if pending:
+        batch.commit()
+    return deleted
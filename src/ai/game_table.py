@@ -0,0 +1,309 @@
+"""
+Chess Engine Metrics AI - Game Table
+Columnar in-memory table of game records with vectorized aggregation
+"""
+
+import json
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+from game_store import normalize_pgn_date
+from time_controls import TIME_CONTROL_CATEGORIES, parse_time_control, time_control_category
+
+# Result codes stored in the result column
+WHITE_WIN = 1
+DRAW = 0
+BLACK_WIN = -1
+UNFINISHED = 2
+
+RESULT_CODES = {
+    '1-0': WHITE_WIN,
+    '1/2-1/2': DRAW,
+    '0-1': BLACK_WIN
+}
+
+# Dimensions accepted by group_stats; the first three need one row per engine per game
+ENGINE_DIMENSIONS = ['engine', 'opponent', 'color']
+GAME_DIMENSIONS = ['time_control', 'event', 'year', 'month', 'day']
+STATS_DIMENSIONS = ENGINE_DIMENSIONS + GAME_DIMENSIONS
+
+# Filters accepted by group_stats
+STATS_FILTERS = ['engine', 'time_control', 'date_from', 'date_to', 'min_elo', 'max_elo']
+
+# Group-by results kept per table, keyed by query signature
+STATS_CACHE_SIZE = 256
+
+# Game fields the table is built from, used as the projection when loading stored games;
+# the raw time_control tag is only parsed for games stored without a category
+GAME_TABLE_FIELDS = ['white', 'black', 'result', 'white_elo', 'black_elo', 'moves', 'game_date', 'date',
+                     'time_control_category', 'time_control', 'event', 'source_document', 'games_generation']
+
+
+class GameTable:
+    """Games held column-wise in a pandas frame
+
+    White and black share one categorical dictionary of engine names in
+    first-seen order, results are int8 codes and Elo ratings are float32
+    with NaN for unrated players, so aggregations run as NumPy group-bys
+    over integer codes instead of Python loops over dicts.
+    """
+    
+    def __init__(self, frame: pd.DataFrame):
+        self.frame = frame
+        self._sides: Optional[pd.DataFrame] = None
+        self._stats_cache: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+    
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> 'GameTable':
+        """Build a table from game records as produced by ingestion or stored in the games collection"""
+        records = list(records)
+        
+        # Interleaving white and black makes the categories follow first-seen engine order
+        names = np.empty(len(records) * 2, dtype=object)
+        names[0::2] = [game.get('white') or 'Unknown' for game in records]
+        names[1::2] = [game.get('black') or 'Unknown' for game in records]
+        codes, engines = pd.factorize(names)
+        engines = pd.Index(engines, dtype=object)
+        
+        dates = [game.get('game_date') or normalize_pgn_date(game.get('date')) for game in records]
+        
+        frame = pd.DataFrame({
+            'white': pd.Categorical.from_codes(codes[0::2], categories=engines),
+            'black': pd.Categorical.from_codes(codes[1::2], categories=engines),
+            'result': np.array([RESULT_CODES.get(game.get('result'), UNFINISHED) for game in records],
+                               dtype=np.int8),
+            'white_elo': np.array([_elo(game.get('white_elo')) for game in records], dtype=np.float32),
+            'black_elo': np.array([_elo(game.get('black_elo')) for game in records], dtype=np.float32),
+            'moves': np.array([game.get('moves') or 0 for game in records], dtype=np.int32),
+            'date': pd.to_datetime(pd.Series(dates, dtype=object), format='%Y-%m-%d', errors='coerce'),
+            'time_control': pd.Categorical([_time_control_category(game) for game in records],
+                                           categories=TIME_CONTROL_CATEGORIES),
+            'event': pd.Categorical([game.get('event') or '?' for game in records]),
+            'source_document': pd.Categorical([game.get('source_document') for game in records])
+        })
+        return cls(frame)
+    
+    def __len__(self) -> int:
+        return len(self.frame)
+    
+    def group_stats(self, group_by: Optional[List[str]] = None,
+                    filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Counts and rates per group, computed in one group-by pass over the filtered rows
+
+        The time_control dimension and filter use time control categories.
+        The engine filter is a list of engine names, as resolved from a name
+        or alias by the engine registry. With an engine dimension or an
+        engine filter the stats are from each engine's point of view (one row per engine per game: wins, draws,
+        losses); otherwise they are per game (white wins, draws, black wins).
+        The Elo band applies to the engine's rating, or to both players for
+        per-game stats. Results are cached per query signature for the
+        lifetime of the table. Raises ValueError for unknown dimensions or
+        malformed filters.
+        """
+        group_by, filters = normalize_stats_query(group_by, filters)
+        signature = stats_signature(group_by, filters)
+        if signature in self._stats_cache:
+            self._stats_cache.move_to_end(signature)
+            return self._stats_cache[signature]
+        
+        by_engine = 'engine' in filters or any(dimension in ENGINE_DIMENSIONS for dimension in group_by)
+        rows = self._side_rows() if by_engine else self._game_rows()
+        rows = rows[self._filter_mask(rows, filters, by_engine)]
+        
+        keys = {dimension: self._dimension_key(rows, dimension) for dimension in group_by}
+        # (count name, outcome column, rate name)
+        if by_engine:
+            outcomes = [('wins', 'win', 'win_rate'), ('draws', 'draw', 'draw_rate'), ('losses', 'loss', 'loss_rate')]
+        else:
+            outcomes = [('white_wins', 'white_win', 'white_win_rate'), ('draws', 'draw', 'draw_rate'),
+                        ('black_wins', 'black_win', 'black_win_rate')]
+        
+        columns = pd.DataFrame({name: rows[column].to_numpy() for name, column, _ in outcomes})
+        columns['games'] = 1
+        columns['total_moves'] = rows['moves'].to_numpy(dtype=np.int64)
+        for dimension, key in keys.items():
+            columns[dimension] = key
+        
+        if group_by:
+            totals = columns.groupby(group_by, observed=True, dropna=False, sort=True).sum()
+        else:
+            totals = columns.sum().to_frame().T
+        
+        games = totals['games'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = {
+                rate: np.where(games > 0, np.round(totals[name].to_numpy() / games * 100, 2), 0.0)
+                for name, _, rate in outcomes
+            }
+            average_moves = np.where(games > 0, np.round(totals['total_moves'].to_numpy() / games, 1), 0.0)
+        
+        groups = []
+        for position, group_key in enumerate(totals.index if group_by else [()]):
+            group_key = group_key if isinstance(group_key, tuple) else (group_key,)
+            group = {dimension: _dimension_label(dimension, value) for dimension, value in zip(group_by, group_key)}
+            group['games'] = int(totals['games'].iloc[position])
+            for name, _, _ in outcomes:
+                group[name] = int(totals[name].iloc[position])
+            for name, values in rates.items():
+                group[name] = float(values[position])
+            group['avg_moves'] = float(average_moves[position])
+            groups.append(group)
+        
+        result = {
+            'group_by': group_by,
+            'filters': filters,
+            'perspective': 'engine' if by_engine else 'game',
+            'signature': signature,
+            'groups': groups,
+            'total_rows': int(len(rows))
+        }
+        
+        self._stats_cache[signature] = result
+        if len(self._stats_cache) > STATS_CACHE_SIZE:
+            self._stats_cache.popitem(last=False)
+        return result
+    
+    def _game_rows(self) -> pd.DataFrame:
+        """One row per game with boolean outcome columns"""
+        frame = self.frame
+        result = frame['result'].to_numpy()
+        return pd.DataFrame({
+            'white_win': result == WHITE_WIN,
+            'draw': result == DRAW,
+            'black_win': result == BLACK_WIN,
+            'white_elo': frame['white_elo'],
+            'black_elo': frame['black_elo'],
+            'moves': frame['moves'],
+            'date': frame['date'],
+            'time_control': frame['time_control'],
+            'event': frame['event']
+        })
+    
+    def _side_rows(self) -> pd.DataFrame:
+        """One row per engine per game (white sides first), built once per table"""
+        if self._sides is None:
+            frame = self.frame
+            engines = frame['white'].cat.categories
+            white = frame['white'].cat.codes.to_numpy()
+            black = frame['black'].cat.codes.to_numpy()
+            result = frame['result'].to_numpy()
+            white_won = result == WHITE_WIN
+            black_won = result == BLACK_WIN
+            
+            self._sides = pd.DataFrame({
+                'engine': pd.Categorical.from_codes(np.concatenate([white, black]), categories=engines),
+                'opponent': pd.Categorical.from_codes(np.concatenate([black, white]), categories=engines),
+                'color': pd.Categorical.from_codes(np.repeat(np.array([0, 1], dtype=np.int8), len(frame)),
+                                                   categories=['white', 'black']),
+                'win': np.concatenate([white_won, black_won]),
+                'draw': np.tile(result == DRAW, 2),
+                'loss': np.concatenate([black_won, white_won]),
+                'elo': np.concatenate([frame['white_elo'].to_numpy(), frame['black_elo'].to_numpy()]),
+                'moves': np.tile(frame['moves'].to_numpy(), 2),
+                'date': np.tile(frame['date'].to_numpy(), 2),
+                'time_control': pd.Categorical.from_codes(np.tile(frame['time_control'].cat.codes.to_numpy(), 2),
+                                                          categories=frame['time_control'].cat.categories),
+                'event': pd.Categorical.from_codes(np.tile(frame['event'].cat.codes.to_numpy(), 2),
+                                                   categories=frame['event'].cat.categories)
+            })
+        return self._sides
+    
+    def _filter_mask(self, rows: pd.DataFrame, filters: Dict[str, Any], by_engine: bool) -> np.ndarray:
+        """Boolean mask of the rows matching every filter"""
+        mask = np.ones(len(rows), dtype=bool)
+        
+        if 'engine' in filters:
+            mask &= rows['engine'].isin(filters['engine']).to_numpy()
+        if filters.get('time_control'):
+            mask &= (rows['time_control'] == filters['time_control']).to_numpy()
+        if filters.get('date_from'):
+            mask &= (rows['date'] >= pd.Timestamp(filters['date_from'])).to_numpy()
+        if filters.get('date_to'):
+            mask &= (rows['date'] <= pd.Timestamp(filters['date_to'])).to_numpy()
+        
+        elo_columns = ['elo'] if by_engine else ['white_elo', 'black_elo']
+        for column in elo_columns:
+            if filters.get('min_elo') is not None:
+                mask &= (rows[column] >= filters['min_elo']).to_numpy()
+            if filters.get('max_elo') is not None:
+                mask &= (rows[column] <= filters['max_elo']).to_numpy()
+        
+        return mask
+    
+    def _dimension_key(self, rows: pd.DataFrame, dimension: str) -> Any:
+        """Column values to group on for one dimension"""
+        if dimension in ('year', 'month', 'day'):
+            dates = rows['date']
+            if dimension == 'year':
+                key = dates.dt.year
+            elif dimension == 'month':
+                key = dates.dt.year * 100 + dates.dt.month
+            else:
+                key = dates.dt.year * 10000 + dates.dt.month * 100 + dates.dt.day
+            return key.to_numpy(dtype=np.float64)
+        return rows[dimension].array
+
+
+def normalize_stats_query(group_by: Optional[List[str]],
+                          filters: Optional[Dict[str, Any]]) -> Tuple[List[str], Dict[str, Any]]:
+    """Validate group-by dimensions and filters and put them in canonical form"""
+    group_by = [dimension.strip().lower() for dimension in (group_by or []) if dimension and dimension.strip()]
+    unknown = [dimension for dimension in group_by if dimension not in STATS_DIMENSIONS]
+    if unknown:
+        raise ValueError(f"Unknown group-by dimension(s): {', '.join(unknown)}. "
+                         f"Supported: {', '.join(STATS_DIMENSIONS)}")
+    group_by = list(dict.fromkeys(group_by))
+    
+    normalized = {}
+    for key, value in (filters or {}).items():
+        if key not in STATS_FILTERS:
+            raise ValueError(f"Unknown filter: {key}. Supported: {', '.join(STATS_FILTERS)}")
+        if value is None or value == '':
+            continue
+        if key in ('min_elo', 'max_elo'):
+            try:
+                normalized[key] = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be an integer rating, got {value!r}")
+        elif key == 'engine':
+            names = [value] if isinstance(value, str) else list(value)
+            normalized[key] = sorted({str(name) for name in names})
+        elif key == 'time_control':
+            normalized[key] = time_control_category(str(value))
+        elif key in ('date_from', 'date_to'):
+            try:
+                normalized[key] = pd.Timestamp(str(value).replace('.', '-')).date().isoformat()
+            except (TypeError, ValueError):
+                raise ValueError(f"{key} must be a date (YYYY-MM-DD), got {value!r}")
+    
+    return group_by, normalized
+
+
+def stats_signature(group_by: List[str], filters: Dict[str, Any]) -> str:
+    """Canonical signature of a normalized stats query, usable as a cache key"""
+    return json.dumps({'group_by': group_by, 'filters': filters}, sort_keys=True, separators=(',', ':'))
+
+
+def _dimension_label(dimension: str, value: Any) -> Any:
+    """JSON-friendly label for a group key"""
+    if dimension in ('year', 'month', 'day'):
+        if value is None or np.isnan(value):
+            return None
+        value = int(value)
+        if dimension == 'year':
+            return value
+        if dimension == 'month':
+            return f"{value // 100:04d}-{value % 100:02d}"
+        return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+    return value
+
+
+def _time_control_category(game: Dict[str, Any]) -> str:
+    """Time control category of a game record, parsed from its tag for games stored without one"""
+    return game.get('time_control_category') or parse_time_control(game.get('time_control')).category
+
+
+def _elo(value: Any) -> float:
+    """Elo rating as a float, NaN when missing"""
+    return float(value) if isinstance(value, (int, float)) else np.nan
@@ -0,0 +1,120 @@
+"""
+Chess Engine Metrics AI - Head-to-Head Index
+Sparse engine x opponent results with a color split, maintained at ingest
+"""
+
+from datetime import datetime
+from typing import Dict, List, Iterable, Optional, Any
+from google.cloud import firestore
+
+HEAD_TO_HEAD_COLLECTION = 'head_to_head'
+
+RESULT_KEYS = ['wins', 'draws', 'losses']
+
+# A document's pairings contribution: white -> black -> [white wins, draws, black wins]
+Pairings = Dict[str, Dict[str, List[int]]]
+
+
+def fold_pairings(pairings: Pairings, game: Dict[str, Any]) -> None:
+    """Fold a single finished game into white -> black [white wins, draws, black wins] counts"""
+    result = game['result']
+    if result not in ('1-0', '1/2-1/2', '0-1'):
+        return
+    
+    counts = pairings.setdefault(game['white'], {}).setdefault(game['black'], [0, 0, 0])
+    counts[0] += result == '1-0'
+    counts[1] += result == '1/2-1/2'
+    counts[2] += result == '0-1'
+
+
+def merge_pairings(pairings: Pairings, shard_pairings: Pairings) -> None:
+    """Merge shard pairing counts into running totals"""
+    for white, opponents in shard_pairings.items():
+        white_pairings = pairings.setdefault(white, {})
+        for black, counts in opponents.items():
+            totals = white_pairings.setdefault(black, [0, 0, 0])
+            for index, value in enumerate(counts):
+                totals[index] += value
+
+
+def head_to_head_updates(added: Iterable[Dict[str, Any]],
+                         replaced: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Build per-engine merge updates moving each engine's row of the head-to-head index
+
+    Every game lands in two rows: the white engine's as_white results
+    against black, and the black engine's as_black results against white.
+    Documents in replaced are subtracted, as for the performance aggregate.
+    """
+    # engine -> opponent -> color -> [wins, draws, losses]
+    delta: Dict[str, Dict[str, Dict[str, List[int]]]] = {}
+    for sign, documents in ((1, added), (-1, replaced or [])):
+        for document in documents:
+            for white, opponents in (document.get('head_to_head') or {}).items():
+                for black, (white_wins, draws, black_wins) in opponents.items():
+                    for engine, opponent, color, counts in (
+                            (white, black, 'as_white', (white_wins, draws, black_wins)),
+                            (black, white, 'as_black', (black_wins, draws, white_wins))):
+                        totals = delta.setdefault(engine, {}).setdefault(opponent, {}).setdefault(color, [0, 0, 0])
+                        for index, value in enumerate(counts):
+                            totals[index] += sign * value
+    
+    updates = {}
+    for engine, opponents in delta.items():
+        row = {
+            opponent: {
+                color: {key: firestore.Increment(value) for key, value in zip(RESULT_KEYS, counts)}
+                for color, counts in colors.items() if any(counts)
+            }
+            for opponent, colors in opponents.items()
+        }
+        row = {opponent: colors for opponent, colors in row.items() if colors}
+        if row:
+            updates[engine] = {
+                'engine': engine,
+                'opponents': row,
+                'updated_at': datetime.utcnow().isoformat()
+            }
+    return updates
+
+
+def build_head_to_head(row_documents: Iterable[Dict[str, Any]], opponents: List[str]) -> Dict[str, Any]:
+    """Combined results of the engines whose rows are given against a set of opponents
+
+    Rows of several engines (e.g. every version of a family) are summed, and
+    so are the entries for several opponents. Games of an engine against
+    itself are left out.
+    """
+    totals = {color: [0, 0, 0] for color in ('as_white', 'as_black')}
+    pairings = []
+    for document in row_documents:
+        engine = document.get('engine')
+        row = document.get('opponents') or {}
+        for opponent in opponents:
+            if opponent == engine or opponent not in row:
+                continue
+            pairing = {'engine': engine, 'opponent': opponent}
+            pairing_counts = [0, 0, 0]
+            for color, counts in totals.items():
+                color_counts = row[opponent].get(color) or {}
+                for index, key in enumerate(RESULT_KEYS):
+                    counts[index] += color_counts.get(key, 0)
+                    pairing_counts[index] += color_counts.get(key, 0)
+            pairing.update(_record(pairing_counts))
+            if pairing['games']:
+                pairings.append(pairing)
+    
+    overall = [white + black for white, black in zip(totals['as_white'], totals['as_black'])]
+    summary = _record(overall)
+    summary['as_white'] = _record(totals['as_white'])
+    summary['as_black'] = _record(totals['as_black'])
+    summary['pairings'] = sorted(pairings, key=lambda pairing: pairing['games'], reverse=True)
+    return summary
+
+
+def _record(counts: List[int]) -> Dict[str, Any]:
+    """Games, W/D/L counts and score percentage"""
+    games = sum(counts)
+    record = {'games': games}
+    record.update(dict(zip(RESULT_KEYS, counts)))
+    record['score'] = round((counts[0] + counts[1] / 2) / games * 100, 2) if games else 0.0
+    return record
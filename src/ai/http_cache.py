@@ -0,0 +1,74 @@
+"""
+Chess Engine Metrics AI - HTTP Caching
+Conditional GET validators from the knowledge base data version and compressed JSON responses
+"""
+
+import os
+import gzip
+from datetime import datetime, timezone
+from typing import Dict, Optional, Any
+
+try:
+    import brotli
+except ImportError:
+    # Responses are gzip-compressed only
+    brotli = None
+
+# JSON responses smaller than this many bytes are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+
+# Compression effort: gzip level 1-9, brotli quality 0-11; mid values keep CPU per response low
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def data_etag(tag: str, stamp: Dict[str, Any]) -> str:
+    """Entity tag for a response derived only from the knowledge base data version"""
+    return f"{tag}-{stamp.get('version')}"
+
+
+def last_modified(stamp: Dict[str, Any]) -> Optional[datetime]:
+    """UTC time of the ingest commit that set the data version"""
+    try:
+        return datetime.fromisoformat(stamp['updated_at']).replace(tzinfo=timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def is_not_modified(request, etag: str, modified: Optional[datetime]) -> bool:
+    """Whether the client's cached copy is current, by If-None-Match or else If-Modified-Since"""
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and modified:
+        # HTTP dates have whole-second resolution
+        return modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def add_validators(response, etag: str, modified: Optional[datetime]):
+    """Attach the ETag and Last-Modified headers, asking clients to revalidate before reuse"""
+    response.set_etag(etag, weak=True)
+    if modified:
+        response.last_modified = modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def compress_response(response, accept_encodings):
+    """Compress a large JSON response with brotli when the client accepts it, otherwise gzip"""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        response.set_data(brotli.compress(body, quality=BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = 'br'
+    elif accept_encodings.quality('gzip') > 0:
+        response.set_data(gzip.compress(body, compresslevel=GZIP_LEVEL))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
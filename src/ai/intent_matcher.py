@@ -0,0 +1,220 @@
+"""
+Chess Engine Metrics AI - Intent Matcher
+Precompiled single-pass keyword matcher for natural language query intents
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+# Query types in priority order: the first type with a matching keyword wins
+INTENT_KEYWORDS = [
+    ('comparison', ['compare', 'vs', 'versus', 'comparison']),
+    ('trend_analysis', ['improve', 'trend', 'over time', 'since', 'progress']),
+    ('problem_diagnosis', ['drop', 'worse', 'problem', 'issue', 'decline', 'regression']),
+    ('best_performer', ['best', 'strongest', 'performs best', 'top', 'leader']),
+    ('factor_analysis', ['factor', 'influence', 'affect', 'cause', 'impact'])
+]
+
+# Performance aspects in priority order
+ASPECT_KEYWORDS = ['tactical', 'positional', 'endgame', 'opening', 'blitz', 'rapid', 'classical']
+
+TIME_CONTROL_KEYWORDS = ['blitz', 'rapid', 'classical']
+
+DURATION_KEYWORDS = {
+    'last month': '1 month',
+    'last week': '1 week'
+}
+
+VERSION_PATTERN = r'\s+(v?\d+\.?\d*)'
+
+# Classified queries remembered per matcher (0 disables memoization)
+INTENT_MEMO_SIZE = int(os.getenv('INTENT_MEMO_SIZE', 4096))
+
+# Decoded intents kept per distinct keyword combination
+DECODED_INTENTS_SIZE = 1024
+
+
+class IntentMatcher:
+    """Classifies a query with one regex scan over the lowercased text
+
+    Every keyword (query type words, aspects, durations and engine names) is
+    compiled into a single trie-shaped regex inside a lookahead, so one
+    findall call reports the longest keyword starting at every position,
+    overlapping occurrences included. Each keyword carries the labels of the
+    keywords that are its prefixes, so the hits cover exactly what the
+    equivalent chain of substring checks would find.
+
+    Labels are packed into one integer of bit flags, so the scan reduces to
+    a few ORs; intents are decoded once per distinct flag set, and recently
+    classified queries are memoized.
+    """
+    
+    def __init__(self, engine_names: Iterable[str], memo_size: int = INTENT_MEMO_SIZE,
+                 engine_aliases: Optional[Dict[str, List[str]]] = None):
+        self.engine_names = list(engine_names)
+        
+        # Lowercase spellings -> engine names they mean; by default each engine is found by its own name
+        if engine_aliases is None:
+            engine_aliases = {engine.lower(): [engine] for engine in self.engine_names}
+        self.memo_size = memo_size
+        self._memo: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._decoded: Dict[Tuple[int, Any], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        
+        # Bit layout: query types and aspects are numbered in priority order,
+        # so the lowest set bit in each field is the winning label
+        self._types = [intent_type for intent_type, _ in INTENT_KEYWORDS]
+        self._aspects = list(ASPECT_KEYWORDS)
+        self._durations = list(DURATION_KEYWORDS)
+        self._aspect_shift = len(self._types)
+        self._duration_shift = self._aspect_shift + len(self._aspects)
+        self._since_bit = 1 << (self._duration_shift + len(self._durations))
+        self._engine_shift = self._duration_shift + len(self._durations) + 1
+        
+        flags: Dict[str, int] = {}
+        for rank, (_, words) in enumerate(INTENT_KEYWORDS):
+            for word in words:
+                flags[word] = flags.get(word, 0) | 1 << rank
+        for rank, aspect in enumerate(self._aspects):
+            flags[aspect] = flags.get(aspect, 0) | 1 << (self._aspect_shift + rank)
+        for rank, phrase in enumerate(self._durations):
+            flags[phrase] = flags.get(phrase, 0) | 1 << (self._duration_shift + rank)
+        flags['since'] |= self._since_bit
+        engine_ranks = {engine: rank for rank, engine in enumerate(self.engine_names)}
+        for alias, engines in engine_aliases.items():
+            for engine in engines:
+                flags[alias] = flags.get(alias, 0) | 1 << (self._engine_shift + engine_ranks[engine])
+        
+        # A hit on a keyword implies a hit on every keyword that is its prefix
+        self._flags = {
+            keyword: _or_all(other_flags for other, other_flags in flags.items() if keyword.startswith(other))
+            for keyword in flags
+        }
+        
+        self._pattern = re.compile(f"(?=({_trie_pattern(self._flags)}))")
+        self._since_pattern = re.compile(r'since' + VERSION_PATTERN)
+    
+    def match(self, query: str) -> Dict[str, Any]:
+        """Return the intent dict for a query"""
+        with self._lock:
+            intent = self._memo.get(query)
+            if intent is not None:
+                self._memo.move_to_end(query)
+        
+        if intent is None:
+            intent = self._classify(query)
+            if self.memo_size > 0:
+                with self._lock:
+                    self._memo[query] = intent
+                    if len(self._memo) > self.memo_size:
+                        self._memo.popitem(last=False)
+        
+        # Callers get their own copy of the mutable parts
+        intent = dict(intent)
+        intent['engines'] = list(intent['engines'])
+        if intent['time_frame']:
+            intent['time_frame'] = dict(intent['time_frame'])
+        return intent
+    
+    def _classify(self, query: str) -> Dict[str, Any]:
+        """Scan a query once and decode the combined keyword flags"""
+        query_lower = query.lower()
+        flags = self._flags
+        bits = 0
+        for keyword in self._pattern.findall(query_lower):
+            bits |= flags[keyword]
+        
+        version = None
+        if bits & self._since_bit:
+            version_match = self._since_pattern.search(query_lower)
+            version = version_match.group(1) if version_match else None
+        
+        key = (bits, version)
+        intent = self._decoded.get(key)
+        if intent is None:
+            intent = self._decode(bits, version)
+            with self._lock:
+                if len(self._decoded) >= DECODED_INTENTS_SIZE:
+                    self._decoded.clear()
+                self._decoded[key] = intent
+        return intent
+    
+    def _decode(self, bits: int, version: Any) -> Dict[str, Any]:
+        """Build the intent dict for a set of keyword flags"""
+        type_bits = bits & ((1 << self._aspect_shift) - 1)
+        aspect_bits = (bits >> self._aspect_shift) & ((1 << len(self._aspects)) - 1)
+        duration_bits = (bits >> self._duration_shift) & ((1 << len(self._durations)) - 1)
+        engine_bits = bits >> self._engine_shift
+        
+        intent = {
+            'type': 'general',
+            'engines': [engine for rank, engine in enumerate(self.engine_names) if engine_bits >> rank & 1],
+            'time_frame': None,
+            'time_control': None,
+            'performance_aspect': 'overall',
+            'comparison': False,
+            'trend_analysis': False,
+            'problem_diagnosis': False
+        }
+        
+        if type_bits:
+            intent['type'] = self._types[_lowest_bit(type_bits)]
+            if intent['type'] in ('comparison', 'trend_analysis', 'problem_diagnosis'):
+                intent[intent['type']] = True
+        
+        if aspect_bits:
+            intent['performance_aspect'] = self._aspects[_lowest_bit(aspect_bits)]
+            for time_control in TIME_CONTROL_KEYWORDS:
+                if aspect_bits >> self._aspects.index(time_control) & 1:
+                    intent['time_control'] = time_control
+                    break
+        
+        if bits & self._since_bit:
+            if version:
+                intent['time_frame'] = {'type': 'since_version', 'value': version}
+        elif duration_bits:
+            phrase = self._durations[_lowest_bit(duration_bits)]
+            intent['time_frame'] = {'type': 'duration', 'value': DURATION_KEYWORDS[phrase]}
+        
+        return intent
+
+
+def _or_all(values: Iterable[int]) -> int:
+    """Bitwise OR of all values"""
+    result = 0
+    for value in values:
+        result |= value
+    return result
+
+
+def _lowest_bit(bits: int) -> int:
+    """Index of the lowest set bit"""
+    return (bits & -bits).bit_length() - 1
+
+
+def _trie_pattern(keywords: Iterable[str]) -> str:
+    """Regex matching any keyword, with shared prefixes factored into a trie
+
+    Optional suffixes are greedy, so at each position the longest keyword
+    wins; the caller accounts for shorter keywords that are its prefixes.
+    """
+    trie: Dict[str, Any] = {}
+    for keyword in keywords:
+        node = trie
+        for char in keyword:
+            node = node.setdefault(char, {})
+        node[''] = {}
+    
+    def build(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else f"(?:{'|'.join(branches)})"
+        if '' in node:
+            body = f"(?:{body})?"
+        return body
+    
+    return build(trie)
@@ -0,0 +1,247 @@
+"""
+Chess Engine Metrics AI - Ingestion Jobs
+Background worker pool for ingestion with a persistent job table and live progress
+"""
+
+import os
+import time
+import uuid
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Callable
+from google.cloud import firestore
+
+JOBS_COLLECTION = 'ingest_jobs'
+
+# Ingestion jobs run concurrently per process (each may still fan out to parse workers)
+INGEST_JOB_WORKERS = int(os.getenv('INGEST_JOB_WORKERS', 2))
+
+# Seconds between progress writes to the job table, which double as a heartbeat
+JOB_PROGRESS_INTERVAL = float(os.getenv('JOB_PROGRESS_INTERVAL', 2))
+
+# Active jobs without a heartbeat for this many seconds are reported as interrupted
+JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 120))
+
+# Per-file details kept in a stored job result
+JOB_RESULT_DETAILS = 100
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# Counters every job reports, filled in by the ingestion code it runs
+PROGRESS_COUNTERS = ['games', 'files_queued', 'files_done', 'files_failed', 'files_skipped']
+
+
+class JobProgress:
+    """Thread-safe progress counters for one running job
+
+    Ingestion code receives this object as its progress argument and calls
+    increment(); the queue persists snapshots on its own schedule, so
+    counting never waits on a database write.
+    """
+    
+    def __init__(self):
+        self.counters = {name: 0 for name in PROGRESS_COUNTERS}
+        self.started = None
+        self._lock = threading.Lock()
+    
+    def increment(self, name: str, amount: int = 1) -> None:
+        """Add to a counter"""
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """Counters plus throughput since the job started"""
+        with self._lock:
+            counters = dict(self.counters)
+        
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        files = counters['files_done'] + counters['files_failed']
+        return {
+            'progress': counters,
+            'elapsed_seconds': round(elapsed, 2),
+            'throughput': {
+                'games_per_second': round(counters['games'] / elapsed, 1) if elapsed > 0 else 0.0,
+                'files_per_second': round(files / elapsed, 2) if elapsed > 0 else 0.0
+            }
+        }
+
+
+class IngestJobQueue:
+    """Runs ingestion work on a local worker pool, tracking each job in the job table
+
+    Jobs are recorded in JOBS_COLLECTION when submitted, so any instance can
+    report on them. While a job is active this process rewrites its progress
+    every JOB_PROGRESS_INTERVAL seconds; a job whose heartbeat stops (the
+    process died or was restarted) is reported as interrupted.
+    """
+    
+    def __init__(self, knowledge_base, workers: Optional[int] = None):
+        self.knowledge_base = knowledge_base
+        self.workers = workers or INGEST_JOB_WORKERS
+        self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='ingest-job')
+        self._active: Dict[str, JobProgress] = {}
+        self._lock = threading.Lock()
+        # Serializes progress writes against a job finishing
+        self._write_lock = threading.Lock()
+        self._heartbeat: Optional[threading.Thread] = None
+    
+    def submit(self, kind: str, params: Dict[str, Any],
+               runner: Callable[[JobProgress], Dict[str, Any]]) -> Dict[str, Any]:
+        """Record a queued job and schedule runner(progress) on the worker pool
+
+        params describe the job for status readers and must not carry the
+        content being ingested. Returns the stored job.
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.utcnow().isoformat()
+        progress = JobProgress()
+        job = {
+            'job_id': job_id,
+            'kind': kind,
+            'status': 'queued',
+            'params': params,
+            'created_at': now,
+            'updated_at': now
+        }
+        job.update(progress.snapshot())
+        self._job_ref(job_id).set(job)
+        
+        with self._lock:
+            self._active[job_id] = progress
+        self._ensure_heartbeat()
+        self._executor.submit(self._run, job_id, progress, runner)
+        print(f"🗂️ Queued {kind} ingestion job {job_id}")
+        return job
+    
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, or None if it does not exist"""
+        snapshot = self._job_ref(job_id).get()
+        if not snapshot.exists:
+            return None
+        
+        job = snapshot.to_dict()
+        with self._lock:
+            progress = self._active.get(job_id)
+        if progress is not None:
+            # Running here: report live counters rather than the last heartbeat
+            job.update(progress.snapshot())
+        elif job.get('status') in ACTIVE_STATUSES and self._is_stale(job):
+            job = self._mark_interrupted(job)
+        return job
+    
+    def list(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recently created jobs, newest first"""
+        docs = (self._jobs()
+                .order_by('created_at', direction=firestore.Query.DESCENDING)
+                .limit(limit)
+                .stream())
+        return [self.get(doc.id) or doc.to_dict() for doc in docs]
+    
+    def _run(self, job_id: str, progress: JobProgress, runner: Callable[[JobProgress], Dict[str, Any]]) -> None:
+        """Execute one job and store its outcome"""
+        progress.started = time.perf_counter()
+        self._job_ref(job_id).set({
+            'status': 'running',
+            'started_at': datetime.utcnow().isoformat(),
+            'updated_at': datetime.utcnow().isoformat()
+        }, merge=True)
+        
+        try:
+            result = runner(progress)
+            failed = result.get('success') is False
+            outcome = {
+                'status': 'failed' if failed else 'completed',
+                'result': _trim_result(result),
+                'error': result.get('error') if failed else None
+            }
+        except Exception as e:
+            print(f"❌ Ingestion job {job_id} failed: {e}")
+            outcome = {
+                'status': 'failed',
+                'result': None,
+                'error': str(e)
+            }
+        
+        # Waits out an in-flight progress write, so none can land after the outcome
+        with self._write_lock, self._lock:
+            self._active.pop(job_id, None)
+        
+        outcome.update(progress.snapshot())
+        outcome['finished_at'] = outcome['updated_at'] = datetime.utcnow().isoformat()
+        try:
+            self._job_ref(job_id).set(outcome, merge=True)
+        except Exception as e:
+            print(f"❌ Failed to record outcome of job {job_id}: {e}")
+        print(f"🗂️ Ingestion job {job_id} {outcome['status']} "
+              f"({outcome['progress']['games']} games in {outcome['elapsed_seconds']}s)")
+    
+    def _ensure_heartbeat(self) -> None:
+        """Start the progress writer thread if it is not running"""
+        with self._lock:
+            if self._heartbeat is None or not self._heartbeat.is_alive():
+                self._heartbeat = threading.Thread(target=self._write_progress, daemon=True)
+                self._heartbeat.start()
+    
+    def _write_progress(self) -> None:
+        """Persist progress of every active job until none are left"""
+        while True:
+            time.sleep(JOB_PROGRESS_INTERVAL)
+            with self._lock:
+                active = list(self._active.items())
+                if not active:
+                    self._heartbeat = None
+                    return
+            
+            for job_id, progress in active:
+                update = progress.snapshot()
+                update['updated_at'] = datetime.utcnow().isoformat()
+                try:
+                    # Held across the write instead of self._lock so submit and get are not blocked on Firestore;
+                    # a finished job's outcome must not be overwritten by a late snapshot
+                    with self._write_lock:
+                        with self._lock:
+                            if job_id not in self._active:
+                                continue
+                        self._job_ref(job_id).set(update, merge=True)
+                except Exception as e:
+                    print(f"Job progress write failed for {job_id}: {e}")
+    
+    def _is_stale(self, job: Dict[str, Any]) -> bool:
+        """Whether an active job's heartbeat is older than JOB_STALE_SECONDS"""
+        try:
+            updated = datetime.fromisoformat(job.get('updated_at', ''))
+        except ValueError:
+            return True
+        return (datetime.utcnow() - updated).total_seconds() > JOB_STALE_SECONDS
+    
+    def _mark_interrupted(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Record that an active job stopped without finishing"""
+        update = {
+            'status': 'interrupted',
+            'error': 'Job stopped reporting progress before finishing; submit it again to retry',
+            'finished_at': datetime.utcnow().isoformat()
+        }
+        self._job_ref(job['job_id']).set(update, merge=True)
+        job.update(update)
+        return job
+    
+    def _job_ref(self, job_id: str):
+        """Job table document for a job"""
+        return self._jobs().document(job_id)
+    
+    def _jobs(self):
+        """The job table, raising when there is no database to keep it in"""
+        if not self.knowledge_base.db:
+            raise RuntimeError('Database connection not available')
+        return self.knowledge_base.db.collection(JOBS_COLLECTION)
+
+
+def _trim_result(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Bound the per-file details stored with a job result"""
+    details = result.get('details')
+    if isinstance(details, list) and len(details) > JOB_RESULT_DETAILS:
+        result = dict(result)
+        result['details'] = details[:JOB_RESULT_DETAILS]
+        result['details_truncated'] = len(details) - JOB_RESULT_DETAILS
+    return result
@@ -5,55 +5,103 @@ Handles data processing, storage, and retrieval for AI analysis
 
 import os
 import json
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterator, TextIO, Callable, Tuple
 from google.cloud import firestore
 from google.cloud import storage
-import chess.pgn
 import io
+from pgn_scanner import iter_game_records, fold_engine_stats
+from parallel_ingest import parse_pgn_parallel, merge_engine_stats, PGN_PARSE_WORKERS, PGN_SHARD_BYTES
+from storage_ingest import StorageIngestPipeline
+from game_store import (GameBatchWriter, committed_games, GAMES_COLLECTION, GAMES_BATCH_SIZE,
+                        FIRESTORE_MAX_BATCH_WRITES)
+from game_table import GameTable, GAME_TABLE_FIELDS
+from engine_registry import EngineRegistry, engine_document_id
+from ratings import RatingModel
+from trends import (fold_engine_daily, merge_engine_daily, trend_updates, build_trend,
+                    TRENDS_COLLECTION)
+from head_to_head import (fold_pairings, merge_pairings, head_to_head_updates, build_head_to_head,
+                          HEAD_TO_HEAD_COLLECTION)
+from time_controls import (fold_time_control_stats, merge_time_control_stats, time_control_update,
+                           time_control_category)
+from document_filters import document_filter_fields, normalize_document_filters, apply_document_filters
+from pagination import (encode_page_token, decode_page_token, DOCUMENT_PAGE_SIZE, STORAGE_PAGE_SIZE)
+from backends import KnowledgeBaseBackend, get_backend
 
 # Set up authentication using Firebase CLI credentials
 os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'chess-engine-metrics-agent')
 
+# Materialized aggregates maintained at ingest time
+AGGREGATES_COLLECTION = 'aggregates'
+PERFORMANCE_AGGREGATE = 'engine_performance'
+TIME_CONTROL_AGGREGATE = 'time_control_performance'
+DATA_VERSION_DOCUMENT = 'data_version'
+
+# Document fields the aggregates are derived from
+AGGREGATE_SOURCE_FIELDS = ['data_type', 'total_games', 'engine_performance', 'time_control_performance',
+                           'games_generation']
+
+# Per-engine daily and pairing counts of a prepared PGN document; they feed the aggregate increments
+# but grow with the engines and days covered, so they are refolded from the games rather than stored
+GAME_CONTRIBUTION_FIELDS = ['engine_daily', 'head_to_head']
+
 class ChessEngineKnowledgeBase:
-    def __init__(self, project_id: Optional[str] = None):
-        """Initialize the knowledge base with Firebase connections"""
+    def __init__(self, project_id: Optional[str] = None, backend: Optional[KnowledgeBaseBackend] = None):
+        """Initialize the knowledge base on the shared storage backend
+
+        The backend comes from KB_BACKEND (Firestore by default, or the local
+        SQLite/directory backend) and its clients are only created on first use,
+        so constructing a knowledge base is cheap.
+        """
         self.project_id = project_id or os.getenv('GOOGLE_CLOUD_PROJECT', 'chess-engine-metrics-agent')
-        
-        # Initialize Firebase clients with Application Default Credentials
-        try:
-            # Use Application Default Credentials (Firebase CLI authentication)
-            self.db = firestore.Client(project=self.project_id)
-            self.storage_client = storage.Client(project=self.project_id)
-            self.bucket = self.storage_client.bucket(f"{self.project_id}.firebasestorage.app")
-            
-            # Test the connection
-            self._test_connection()
-            print(f"✅ Connected to Firebase project: {self.project_id}")
-            
-        except Exception as e:
-            print(f"⚠️ Firebase connection issue: {e}")
-            print("💡 Ensure you're authenticated with: firebase login")
-            print("Using fallback mode - some features may be limited")
-            self.db = None
-            self.storage_client = None
-            self.bucket = None
-    
-    def _test_connection(self):
-        """Test Firebase connections"""
-        if self.db:
-            # Test Firestore connection
-            test_ref = self.db.collection('_test').document('connection')
-            test_ref.set({'timestamp': firestore.SERVER_TIMESTAMP}, merge=True)
-        
-        if self.bucket:
-            # Test Storage connection by checking if bucket exists
-            self.bucket.exists()
-        
-    def ingest_pgn_data(self, pgn_content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
-        """Process PGN content and extract game data"""
+        self.backend = backend or get_backend(self.project_id)
+        self._game_table: Optional[GameTable] = None
+        self._game_table_version: Optional[str] = None
+        self._game_table_lock = threading.Lock()
+        self._engine_registry: Optional[EngineRegistry] = None
+        self._engine_registry_version: Optional[int] = None
+        self._rating_model = RatingModel()
+        self._rating_version: Optional[int] = None
+        self._rating_lock = threading.Lock()
+        self._performance_aggregate_ready = False
+        self._performance_aggregate_lock = threading.Lock()
+    
+    @property
+    def db(self):
+        """Document store, or None when the backend is unavailable"""
+        return self.backend.db
+    
+    @property
+    def storage_client(self) -> Optional[storage.Client]:
+        """Storage client, or None when the backend has none"""
+        return self.backend.storage_client
+    
+    @property
+    def bucket(self):
+        """Storage bucket, or None when the backend is unavailable"""
+        return self.backend.bucket
+    
+    def ingest_pgn_data(self, pgn_content: str, metadata: Dict[str, Any],
+                        analyze_moves: bool = False, workers: Optional[int] = None,
+                        progress=None) -> Dict[str, Any]:
+        """Process PGN content and extract game data
+
+        Games are scanned header-only by default; pass analyze_moves=True to
+        build full game trees when move-level analysis is needed.
+        """
+        if len(pgn_content) < PGN_SHARD_BYTES:
+            workers = 1
+        return self.ingest_pgn_stream(io.StringIO(pgn_content), metadata, analyze_moves, workers, progress)
+    
+    def ingest_pgn_stream(self, pgn_io: TextIO, metadata: Dict[str, Any],
+                          analyze_moves: bool = False, workers: Optional[int] = None,
+                          progress=None) -> Dict[str, Any]:
+        """Process PGN from a text stream, folding games into running engine statistics
+
+        Stored games are counted on the optional job progress object as each
+        batch commits.
+        """
         try:
             if not self.db:
                 return {
@@ -61,47 +109,89 @@ class ChessEngineKnowledgeBase:
                     'error': 'Database connection not available'
                 }
             
-            games = []
-            pgn_io = io.StringIO(pgn_content)
-            
-            while True:
-                game = chess.pgn.read_game(pgn_io)
-                if game is None:
-                    break
-                    
-                game_data = self._extract_game_data(game)
-                if game_data:
-                    games.append(game_data)
-            
-            # Analyze engine performance
-            engine_stats = self._analyze_engine_performance(games)
-            
-            # Store processed data
-            processed_data = {
-                'source_file': metadata.get('fileName', 'unknown'),
-                'total_games': len(games),
-                'games': games[:100],  # Store first 100 games
-                'engine_performance': engine_stats,
-                'processed_at': datetime.utcnow().isoformat(),
-                'data_type': 'pgn_analysis'
-            }
-            
-            # Save to Firestore
-            doc_ref = self.db.collection('knowledge_base').add(processed_data)
+            doc_ref = self.db.collection('knowledge_base').document()
+            game_writer = GameBatchWriter(self.db, doc_ref.id, metadata.get('fileName', 'unknown'),
+                                          progress=progress)
+            try:
+                processed_data = self.prepare_pgn_document(pgn_io, metadata, analyze_moves, workers, game_writer.add)
+                game_writer.close()
+                processed_data['games_generation'] = game_writer.generation
+                
+                # Save to Firestore together with the aggregate increments
+                self._write_document(doc_ref, processed_data)
+            except Exception:
+                # Games of a document that was never written would be counted without it
+                game_writer.discard()
+                raise
             
             return {
                 'success': True,
-                'games_processed': len(games),
-                'engine_stats': engine_stats,
-                'document_id': doc_ref[1].id
+                'games_processed': processed_data['total_games'],
+                'engine_stats': processed_data['engine_performance'],
+                'document_id': doc_ref.id
             }
-            
+        
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def prepare_pgn_document(self, pgn_io: TextIO, metadata: Dict[str, Any],
+                             analyze_moves: bool = False, workers: Optional[int] = None,
+                             game_sink: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+        """Parse a PGN stream into a knowledge base document without writing it
+
+        Each game record is passed to game_sink as it is parsed rather than
+        embedded in the document, so peak memory does not grow with the size
+        of the stream. With more than one worker the stream is sharded at game
+        boundaries and parsed in a process pool; shard results are merged in
+        input order, so the outcome matches the serial path.
+        """
+        engine_stats = {}
+        engine_daily = {}
+        pairings = {}
+        time_control_stats = {}
+        total_games = 0
+        workers = workers or PGN_PARSE_WORKERS
+        
+        if workers > 1:
+            shard_results = parse_pgn_parallel(pgn_io, analyze_moves, game_sink is not None, workers)
+            for (shard_games, shard_total, shard_stats, shard_daily, shard_pairings,
+                 shard_time_controls) in shard_results:
+                merge_engine_stats(engine_stats, shard_stats)
+                merge_engine_daily(engine_daily, shard_daily)
+                merge_pairings(pairings, shard_pairings)
+                merge_time_control_stats(time_control_stats, shard_time_controls)
+                for game_data in shard_games:
+                    game_sink(game_data)
+                total_games += shard_total
+        else:
+            for game_data in self._iter_pgn_games(pgn_io, analyze_moves):
+                fold_engine_stats(engine_stats, game_data)
+                fold_engine_daily(engine_daily, game_data)
+                fold_pairings(pairings, game_data)
+                fold_time_control_stats(time_control_stats, game_data)
+                if game_sink:
+                    game_sink(game_data)
+                total_games += 1
+        
+        document = {
+            'source_file': metadata.get('fileName', 'unknown'),
+            'total_games': total_games,
+            'games_collection': GAMES_COLLECTION,
+            'engine_performance': engine_stats,
+            'engine_daily': engine_daily,
+            'head_to_head': pairings,
+            'time_control_performance': time_control_stats,
+            'processed_at': datetime.utcnow().isoformat(),
+            'data_type': 'pgn_analysis'
+        }
+        
+        # Engines, time controls and date range present, for indexed filtering in query_knowledge_base
+        document.update(document_filter_fields(time_control_stats, engine_daily))
+        return document
+    
     def ingest_json_data(self, json_content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Process JSON analysis data"""
         try:
@@ -111,34 +201,39 @@ class ChessEngineKnowledgeBase:
                     'error': 'Database connection not available'
                 }
             
-            data = json.loads(json_content)
-            
-            # Extract performance metrics
-            metrics = self._extract_json_metrics(data)
-            
-            processed_data = {
-                'source_file': metadata.get('fileName', 'unknown'),
-                'raw_data': data,
-                'extracted_metrics': metrics,
-                'processed_at': datetime.utcnow().isoformat(),
-                'data_type': 'json_analysis'
-            }
+            processed_data = self.prepare_json_document(json_content, metadata)
             
             # Save to Firestore
-            doc_ref = self.db.collection('knowledge_base').add(processed_data)
+            doc_ref = self.db.collection('knowledge_base').document()
+            self._write_document(doc_ref, processed_data)
             
             return {
                 'success': True,
-                'metrics_extracted': len(metrics),
-                'document_id': doc_ref[1].id
+                'metrics_extracted': len(processed_data['extracted_metrics']),
+                'document_id': doc_ref.id
             }
-            
+        
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
+    def prepare_json_document(self, json_content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Parse JSON analysis data into a knowledge base document without writing it"""
+        data = json.loads(json_content)
+        
+        # Extract performance metrics
+        metrics = self._extract_json_metrics(data)
+        
+        return {
+            'source_file': metadata.get('fileName', 'unknown'),
+            'raw_data': data,
+            'extracted_metrics': metrics,
+            'processed_at': datetime.utcnow().isoformat(),
+            'data_type': 'json_analysis'
+        }
+    
     def ingest_markdown_data(self, md_content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Process Markdown documentation"""
         try:
@@ -148,65 +243,227 @@ class ChessEngineKnowledgeBase:
                     'error': 'Database connection not available'
                 }
             
-            # Extract structured information
-            analysis = self._analyze_markdown_content(md_content)
-            
-            processed_data = {
-                'source_file': metadata.get('fileName', 'unknown'),
-                'content': md_content,
-                'analysis': analysis,
-                'processed_at': datetime.utcnow().isoformat(),
-                'data_type': 'markdown_analysis'
-            }
+            processed_data = self.prepare_markdown_document(md_content, metadata)
             
             # Save to Firestore
-            doc_ref = self.db.collection('knowledge_base').add(processed_data)
+            doc_ref = self.db.collection('knowledge_base').document()
+            self._write_document(doc_ref, processed_data)
             
             return {
                 'success': True,
-                'sections_found': len(analysis.get('sections', [])),
-                'document_id': doc_ref[1].id
+                'sections_found': len(processed_data['analysis'].get('sections', [])),
+                'document_id': doc_ref.id
             }
-            
+        
         except Exception as e:
             return {
                 'success': False,
                 'error': str(e)
             }
     
-    def query_knowledge_base(self, query_type: str, filters: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
-        """Query the knowledge base for relevant data"""
+    def prepare_markdown_document(self, md_content: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Analyze Markdown documentation into a knowledge base document without writing it"""
+        # Extract structured information
+        analysis = self._analyze_markdown_content(md_content)
+        
+        return {
+            'source_file': metadata.get('fileName', 'unknown'),
+            'content': md_content,
+            'analysis': analysis,
+            'processed_at': datetime.utcnow().isoformat(),
+            'data_type': 'markdown_analysis'
+        }
+    
+    def query_knowledge_base(self, query_type: str, filters: Optional[Dict[str, Any]] = None,
+                             fields: Optional[List[str]] = None, limit: int = DOCUMENT_PAGE_SIZE) -> List[Dict[str, Any]]:
+        """Query the knowledge base for relevant data
+
+        Returns the newest limit documents; use query_knowledge_base_page to
+        go further. Supported filters: data_type, plus engine (a name or a
+        list of names), time_control (a category) and date_from / date_to
+        (ISO dates), which are answered server-side from the fields recorded
+        on PGN documents at ingest. Pass fields to fetch only those document
+        fields (a Firestore projection) instead of the full game, raw data
+        and content payloads. Raises ValueError for an unknown time control
+        or a malformed date.
+        """
+        return self.query_knowledge_base_page(filters, fields, limit)['documents']
+    
+    def query_knowledge_base_page(self, filters: Optional[Dict[str, Any]] = None,
+                                  fields: Optional[List[str]] = None, page_size: int = DOCUMENT_PAGE_SIZE,
+                                  page_token: Optional[str] = None) -> Dict[str, Any]:
+        """One page of knowledge base documents, newest first, with the token for the next page
+
+        Takes the same filters and fields as query_knowledge_base.
+        next_page_token is None on the last page. Documents are streamed and
+        at most one more than a page is read. Raises ValueError for bad
+        filters or a malformed page token.
+        """
+        document_filters = normalize_document_filters(filters or {})
+        cursor = decode_page_token(page_token, 2) if page_token else None
         try:
-            if not self.db:
-                return []
+            collection_ref = self._knowledge_base_query(filters or {}, document_filters)
+            if collection_ref is None:
+                return {'documents': [], 'next_page_token': None}
             
-            # Build query
-            collection_ref = self.db.collection('knowledge_base')
+            if fields:
+                # Every document's processed_at is needed to build the next cursor
+                collection_ref = collection_ref.select(list(dict.fromkeys(list(fields) + ['processed_at'])))
             
-            if filters:
-                if 'data_type' in filters:
-                    collection_ref = collection_ref.where('data_type', '==', filters['data_type'])
-                if 'engine' in filters:
-                    # This would need more sophisticated querying in production
-                    pass
+            collection_ref = collection_ref.order_by('processed_at', direction=firestore.Query.DESCENDING)
+            if cursor:
+                collection_ref = collection_ref.start_after(self._document_cursor(*cursor))
             
-            # Execute query
-            docs = collection_ref.order_by('processed_at', direction=firestore.Query.DESCENDING).limit(50).stream()
-            
-            results = []
-            for doc in docs:
+            documents = []
+            last_cursor = None
+            next_page_token = None
+            for doc in collection_ref.limit(page_size + 1).stream():
+                if len(documents) == page_size:
+                    # One more document exists, so there is another page
+                    next_page_token = encode_page_token(last_cursor)
+                    break
+                
                 data = doc.to_dict()
                 data['id'] = doc.id
-                results.append(data)
-            
-            return results
+                last_cursor = [data.get('processed_at'), doc.id]
+                if fields and 'processed_at' not in fields:
+                    data.pop('processed_at', None)
+                documents.append(data)
             
+            return {'documents': documents, 'next_page_token': next_page_token}
+        
         except Exception as e:
             print(f"Query error: {e}")
-            return []
+            return {'documents': [], 'next_page_token': None}
+    
+    def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        """Count knowledge base documents with a server-side aggregation, without reading them
+
+        Takes the same filters as query_knowledge_base.
+        """
+        document_filters = normalize_document_filters(filters or {})
+        try:
+            collection_ref = self._knowledge_base_query(filters or {}, document_filters)
+            if collection_ref is None:
+                return 0
+            
+            return int(collection_ref.count().get()[0][0].value)
+        
+        except Exception as e:
+            print(f"Count error: {e}")
+            return 0
+    
+    def get_game_table(self) -> GameTable:
+        """Columnar table of every committed game, reloaded only when the data version changes"""
+        version = self.data_version()
+        with self._game_table_lock:
+            if self._game_table is None or version != self._game_table_version:
+                generations = self._game_generations()
+                docs = self.db.collection(GAMES_COLLECTION).select(GAME_TABLE_FIELDS).stream()
+                self._game_table = GameTable.from_records(
+                    committed_games((doc.to_dict() for doc in docs), generations))
+                self._game_table_version = version
+                print(f"📊 Loaded game table with {len(self._game_table)} games")
+            return self._game_table
+    
+    def get_stats(self, group_by: Optional[List[str]] = None,
+                  filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Group-by counts and rates over every stored game
+
+        An engine filter is resolved through the engine registry, so an alias
+        covers every engine it refers to. Raises ValueError for unknown
+        dimensions or malformed filters.
+        """
+        if not self.db:
+            return {
+                'groups': [],
+                'error': 'Database connection not available'
+            }
+        
+        filters = dict(filters or {})
+        if filters.get('engine'):
+            filters['engine'] = self.get_engine_registry().resolve(str(filters['engine']))
+        return self.get_game_table().group_stats(group_by, filters)
+    
+    def get_engine_registry(self, data_version: Optional[int] = None) -> EngineRegistry:
+        """Registry of every engine with ingested games, rebuilt only when the data version changes
+
+        Engine names come from the materialized performance aggregate, which
+        ingestion keeps current, so no separate index has to be kept in sync.
+        """
+        if data_version is None:
+            data_version = self.data_version()
+        
+        if self._engine_registry is None or data_version != self._engine_registry_version:
+            aggregate = self._performance_aggregate_ref().get(field_paths=['engines'])
+            engines = aggregate.to_dict().get('engines', {}) if aggregate.exists else {}
+            self._engine_registry = EngineRegistry(
+                engine for engine, stats in engines.items() if stats.get('total', 0) > 0)
+            self._engine_registry_version = data_version
+        return self._engine_registry
+    
+    def get_engine_ratings(self, engine_name: Optional[str] = None,
+                           min_games: Optional[int] = None) -> Dict[str, Any]:
+        """Bradley-Terry ratings with error bars fitted from the head-to-head index
+
+        The index rows are read instead of every stored game, and the fit is
+        redone only when the data version changes, starting from the previous
+        ratings so new games cost a few Newton steps rather than a fit from
+        scratch. An engine name or alias narrows the ratings to the engines it
+        resolves to, and min_games to engines with at least that many games.
+        Raises ValueError for an engine name that matches no engine.
+        """
+        if not self.db:
+            return {
+                'ratings': {},
+                'error': 'Database connection not available'
+            }
+        
+        version = self.data_version()
+        wanted = None
+        if engine_name is not None:
+            wanted = self.get_engine_registry(version).resolve(engine_name) if engine_name.strip() else []
+            if not wanted:
+                raise ValueError(f"Unknown engine: {engine_name!r}")
+        
+        with self._rating_lock:
+            if self._rating_version is None or version != self._rating_version:
+                rows = self.db.collection(HEAD_TO_HEAD_COLLECTION).select(['engine', 'opponents']).stream()
+                self._rating_model.load_head_to_head(doc.to_dict() for doc in rows)
+                iterations = self._rating_model.fit()
+                self._rating_version = version
+                print(f"📈 Fitted ratings for {len(self._rating_model.engines)} engines in {iterations} iterations")
+            summary = self._rating_model.summary()
+        
+        if wanted is not None or min_games:
+            summary['ratings'] = {
+                engine: rating for engine, rating in summary['ratings'].items()
+                if (wanted is None or engine in wanted) and rating['games'] >= (min_games or 0)
+            }
+        return summary
     
-    def get_engine_performance_summary(self, engine_name: Optional[str] = None) -> Dict[str, Any]:
-        """Get performance summary for specific engine or all engines"""
+    def data_version(self) -> Optional[int]:
+        """Counter bumped by every ingest commit, for keying caches of derived results"""
+        snapshot = self._data_version_ref().get(field_paths=['version'])
+        return snapshot.to_dict().get('version') if snapshot.exists else None
+    
+    def data_version_stamp(self) -> Optional[Dict[str, Any]]:
+        """Data version with the time of the ingest commit that set it, for HTTP cache validators"""
+        snapshot = self._data_version_ref().get(field_paths=['version', 'updated_at'])
+        return snapshot.to_dict() if snapshot.exists else None
+    
+    def get_engine_performance_summary(self, engine_name: Optional[str] = None,
+                                       time_control: Optional[str] = None) -> Dict[str, Any]:
+        """Get performance summary for specific engine or all engines
+
+        Reads the materialized aggregate maintained at ingest time, rebuilding
+        it from every PGN analysis document if it has not been initialized. With a
+        time control category (bullet, blitz, rapid, classical, untimed,
+        unknown) the per-category slice of the results is read instead.
+        Raises ValueError for an unknown category.
+        """
+        if time_control:
+            time_control = time_control_category(time_control)
         try:
             if not self.db:
                 return {
@@ -215,28 +472,43 @@ class ChessEngineKnowledgeBase:
                     'error': 'Database connection not available'
                 }
             
-            # Query PGN analysis data
-            pgn_data = self.query_knowledge_base('performance', {'data_type': 'pgn_analysis'})
+            if time_control:
+                aggregate = self._time_control_aggregate_ref().get()
+                aggregate_data = aggregate.to_dict() if aggregate.exists else {}
+                engines = {
+                    engine: categories[time_control]
+                    for engine, categories in aggregate_data.get('engines', {}).items()
+                    if time_control in categories
+                }
+                # Every game adds one result for each side
+                aggregate_data['total_games'] = sum(stats.get('total', 0) for stats in engines.values()) // 2
+            else:
+                aggregate = self._performance_aggregate_ref().get()
+                if aggregate.exists and aggregate.to_dict().get('initialized'):
+                    aggregate_data = aggregate.to_dict()
+                else:
+                    aggregate_data = self.rebuild_performance_aggregate()
+                
+                engines = aggregate_data.get('engines', {})
+            if engine_name:
+                # Resolve the name or alias (any version or spelling) through the registry
+                engines = {
+                    engine: engines[engine]
+                    for engine in self.get_engine_registry().resolve(engine_name)
+                    if engine in engines
+                }
             
-            # Aggregate performance data
             all_stats = {}
-            total_games = 0
-            
-            for doc in pgn_data:
-                if 'engine_performance' in doc:
-                    for engine, stats in doc['engine_performance'].items():
-                        if engine_name and engine.lower() != engine_name.lower():
-                            continue
-                            
-                        if engine not in all_stats:
-                            all_stats[engine] = {'wins': 0, 'draws': 0, 'losses': 0, 'total': 0}
-                        
-                        all_stats[engine]['wins'] += stats.get('wins', 0)
-                        all_stats[engine]['draws'] += stats.get('draws', 0)
-                        all_stats[engine]['losses'] += stats.get('losses', 0)
-                        all_stats[engine]['total'] += stats.get('total', 0)
+            for engine, stats in engines.items():
+                if stats.get('total', 0) <= 0:
+                    continue
                 
-                total_games += doc.get('total_games', 0)
+                all_stats[engine] = {
+                    'wins': stats.get('wins', 0),
+                    'draws': stats.get('draws', 0),
+                    'losses': stats.get('losses', 0),
+                    'total': stats.get('total', 0)
+                }
             
             # Calculate win rates
             for engine, stats in all_stats.items():
@@ -247,12 +519,15 @@ class ChessEngineKnowledgeBase:
                 else:
                     stats['win_rate'] = stats['draw_rate'] = stats['loss_rate'] = 0
             
-            return {
+            summary = {
                 'engines': all_stats,
-                'total_games_analyzed': total_games,
-                'last_updated': datetime.utcnow().isoformat()
+                'total_games_analyzed': aggregate_data.get('total_games', 0),
+                'last_updated': aggregate_data.get('updated_at', datetime.utcnow().isoformat())
             }
-            
+            if time_control:
+                summary['time_control'] = time_control
+            return summary
+        
         except Exception as e:
             return {
                 'engines': {},
@@ -260,63 +535,412 @@ class ChessEngineKnowledgeBase:
                 'error': str(e)
             }
     
-    def _extract_game_data(self, game) -> Optional[Dict[str, Any]]:
-        """Extract structured data from a chess game"""
+    def rebuild_performance_aggregate(self) -> Dict[str, Any]:
+        """Recompute the materialized performance aggregate from all PGN analysis documents"""
+        engine_stats = {}
+        total_games = 0
+        
+        docs = (self.db.collection('knowledge_base')
+                .where('data_type', '==', 'pgn_analysis')
+                .select(['total_games', 'engine_performance'])
+                .stream())
+        for doc in docs:
+            data = doc.to_dict()
+            merge_engine_stats(engine_stats, data.get('engine_performance', {}))
+            total_games += data.get('total_games', 0)
+        
+        aggregate_data = {
+            'engines': engine_stats,
+            'total_games': total_games,
+            'initialized': True,
+            'updated_at': datetime.utcnow().isoformat()
+        }
+        self._performance_aggregate_ref().set(aggregate_data)
+        self._performance_aggregate_ready = True
+        print(f"✅ Rebuilt performance aggregate from {total_games} games")
+        return aggregate_data
+    
+    def get_engine_trend(self, engine_name: str, bucket: str = 'week', window_days: int = 28,
+                         rolling: int = 4, date_from: Optional[str] = None,
+                         date_to: Optional[str] = None) -> Dict[str, Any]:
+        """Bucketed results, rolling win rates and window-over-window change for an engine
+
+        The name resolves through the engine registry, so a family name sums
+        every version. Reads only the pre-bucketed trend documents maintained
+        at ingest, never individual games. Raises ValueError for an unknown bucket.
+        """
+        if not self.db:
+            return {
+                'engine': engine_name,
+                'series': [],
+                'error': 'Database connection not available'
+            }
+        
+        engines = self.get_engine_registry().resolve(engine_name)
+        refs = [self.db.collection(TRENDS_COLLECTION).document(engine_document_id(engine)) for engine in engines]
+        documents = [snapshot.to_dict() for snapshot in self.db.get_all(refs) if snapshot.exists] if refs else []
+        
+        trend = build_trend(documents, bucket, window_days, rolling, date_from, date_to)
+        trend['engine'] = engine_name
+        trend['engines'] = engines
+        return trend
+    
+    def get_head_to_head(self, engine_name: str, opponent_name: str) -> Dict[str, Any]:
+        """Direct results of an engine against an opponent, split by the engine's color
+
+        Both names resolve through the engine registry, so family names sum
+        every version. Only the engine's rows of the head-to-head index are
+        read, never individual games.
+        """
+        if not self.db:
+            return {
+                'engine': engine_name,
+                'opponent': opponent_name,
+                'games': 0,
+                'error': 'Database connection not available'
+            }
+        
+        registry = self.get_engine_registry()
+        engines = registry.resolve(engine_name)
+        opponents = registry.resolve(opponent_name)
+        refs = [self.db.collection(HEAD_TO_HEAD_COLLECTION).document(engine_document_id(engine)) for engine in engines]
+        rows = [snapshot.to_dict() for snapshot in self.db.get_all(refs) if snapshot.exists] if refs else []
+        
+        head_to_head = build_head_to_head(rows, opponents)
+        head_to_head.update({
+            'engine': engine_name,
+            'opponent': opponent_name,
+            'engines': engines,
+            'opponents': opponents
+        })
+        return head_to_head
+    
+    def rebuild_aggregates(self) -> Dict[str, Any]:
+        """Recompute every materialized aggregate from the stored documents and games
+
+        For backfilling after an upgrade or repairing drift; ingests that
+        commit while it runs may be counted twice or not at all, so run it
+        when no ingest is in progress.
+        """
         try:
-            headers = game.headers
+            if not self.db:
+                return {
+                    'success': False,
+                    'error': 'Database connection not available'
+                }
+            
+            performance = self.rebuild_performance_aggregate()
+            games_counted = self.rebuild_game_aggregates()
             
             return {
-                'white': headers.get('White', 'Unknown'),
-                'black': headers.get('Black', 'Unknown'),
-                'result': headers.get('Result', '*'),
-                'date': headers.get('Date', '????.??.??'),
-                'event': headers.get('Event', 'Unknown'),
-                'round': headers.get('Round', '?'),
-                'time_control': headers.get('TimeControl', 'Unknown'),
-                'white_elo': self._parse_elo(headers.get('WhiteElo', '?')),
-                'black_elo': self._parse_elo(headers.get('BlackElo', '?')),
-                'moves': len(list(game.mainline_moves())),
-                'termination': headers.get('Termination', 'Unknown')
+                'success': True,
+                'total_games': performance['total_games'],
+                'games_counted': games_counted
             }
-            
+        
         except Exception as e:
-            print(f"Error extracting game data: {e}")
-            return None
+            return {
+                'success': False,
+                'error': str(e)
+            }
     
-    def _parse_elo(self, elo_str: str) -> Optional[int]:
-        """Parse ELO rating from string"""
+    def rebuild_game_aggregates(self) -> int:
+        """Recompute the trend buckets, head-to-head rows and time control slices from the games collection
+
+        Also backfills each PGN document's time_control_performance
+        contribution, so later re-ingests of documents written before these
+        aggregates existed stay exact, and its engine, time control and date
+        filter fields, and drops the engine_daily and head_to_head maps older
+        documents stored. Returns the number of games counted.
+        """
+        per_document: Dict[str, Dict[str, Any]] = {}
+        counted = 0
+        games = self.db.collection(GAMES_COLLECTION).select(
+            ['white', 'black', 'result', 'game_date', 'time_control', 'source_document', 'games_generation']).stream()
+        for game in committed_games((doc.to_dict() for doc in games), self._game_generations()):
+            contribution = per_document.setdefault(game.get('source_document'), {
+                'engine_daily': {},
+                'head_to_head': {},
+                'time_control_performance': {}
+            })
+            fold_engine_daily(contribution['engine_daily'], game)
+            fold_pairings(contribution['head_to_head'], game)
+            fold_time_control_stats(contribution['time_control_performance'], game)
+            counted += 1
+        
+        for contribution in per_document.values():
+            contribution.update(document_filter_fields(contribution['time_control_performance'],
+                                                       contribution['engine_daily']))
+        
+        batch = self.db.batch()
+        batch.delete(self._time_control_aggregate_ref())
+        pending = 1
+        for collection in (TRENDS_COLLECTION, HEAD_TO_HEAD_COLLECTION):
+            for doc in self.db.collection(collection).select([]).stream():
+                batch.delete(doc.reference)
+                pending += 1
+                if pending >= GAMES_BATCH_SIZE:
+                    batch.commit()
+                    batch = self.db.batch()
+                    pending = 0
+        if pending:
+            batch.commit()
+        
+        batch = self.db.batch()
+        pending = 0
+        for document_id, contribution in per_document.items():
+            if not document_id:
+                continue
+            stored = self.stored_document(contribution)
+            stored.update({field: firestore.DELETE_FIELD for field in GAME_CONTRIBUTION_FIELDS})
+            batch.set(self.db.collection('knowledge_base').document(document_id), stored, merge=True)
+            pending += 1
+            if pending >= GAMES_BATCH_SIZE:
+                batch.commit()
+                batch = self.db.batch()
+                pending = 0
+        if pending:
+            batch.commit()
+        
+        # Aggregate totals and the version bump are committed like a normal ingest
+        self.commit_with_aggregates([], list(per_document.values()))
+        
+        print(f"✅ Rebuilt engine trends, head-to-head index and time control slices from {counted} games")
+        return counted
+    
+    def commit_with_aggregates(self, writes: List[Tuple[Any, Dict[str, Any]]], added: List[Dict[str, Any]],
+                               replaced: Optional[List[Dict[str, Any]]] = None,
+                               max_writes: int = FIRESTORE_MAX_BATCH_WRITES) -> None:
+        """Commit document writes together with the aggregate increments and data version bump they cause
+
+        writes are (reference, data) pairs set in full. replaced holds earlier
+        versions of documents being overwritten, read with
+        load_aggregate_sources; their contribution is backed out. Everything
+        goes in one batch when it fits in max_writes. Otherwise the trend and
+        head-to-head rows are committed first, max_writes at a time, and the
+        documents, totals and version bump last; if a later batch fails, the
+        rows already committed are moved back before the error is raised.
+        """
+        rows = self._aggregate_row_updates(added, replaced)
+        totals = self._aggregate_total_writes(added, replaced)
+        if len(rows) + len(writes) + len(totals) <= max_writes:
+            self._commit_writes(writes, self._aggregate_row_writes(rows, list(rows)) + totals)
+            return
+        
+        committed = []
         try:
-            return int(elo_str) if elo_str != '?' else None
-        except (ValueError, TypeError):
+            keys = list(rows)
+            for start in range(0, len(keys), max_writes):
+                chunk = keys[start:start + max_writes]
+                self._commit_writes([], self._aggregate_row_writes(rows, chunk))
+                committed.extend(chunk)
+            self._commit_writes(writes, totals)
+        except Exception:
+            self._revert_aggregate_rows(committed, added, replaced, max_writes)
+            raise
+    
+    def load_aggregate_sources(self, document_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Read the aggregate source fields of existing knowledge base documents, keyed by document ID
+
+        PGN documents get their engine_daily and head_to_head contributions
+        refolded from the games of their committed generation.
+        """
+        if not document_ids:
+            return {}
+        
+        refs = [self.db.collection('knowledge_base').document(doc_id) for doc_id in document_ids]
+        sources = {
+            snapshot.id: snapshot.to_dict()
+            for snapshot in self.db.get_all(refs, field_paths=AGGREGATE_SOURCE_FIELDS)
+            if snapshot.exists
+        }
+        for document_id, source in sources.items():
+            if source.get('data_type') == 'pgn_analysis':
+                source.update(self._game_contributions(document_id, source.get('games_generation')))
+        return sources
+    
+    def stored_document(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields of a prepared document that are written, leaving out its game contributions"""
+        return {key: value for key, value in document.items() if key not in GAME_CONTRIBUTION_FIELDS}
+    
+    def _document_cursor(self, processed_at: str, document_id: str):
+        """Cursor resuming after a document: its snapshot, or its processed_at if it has since been deleted
+
+        The snapshot also carries the date fields a date-filtered query orders by.
+        """
+        snapshot = self.db.collection('knowledge_base').document(document_id).get(
+            field_paths=['processed_at', 'first_game_date', 'last_game_date'])
+        if snapshot.exists and snapshot.to_dict().get('processed_at') == processed_at:
+            return snapshot
+        return {'processed_at': processed_at}
+    
+    def _knowledge_base_query(self, filters: Dict[str, Any], document_filters: Dict[str, Any]):
+        """Filtered knowledge base query, or None when nothing can match or there is no database"""
+        if not self.db:
             return None
+        
+        collection_ref = self.db.collection('knowledge_base')
+        if document_filters:
+            # Only PGN documents record engines, time controls and dates
+            if filters.get('data_type', 'pgn_analysis') != 'pgn_analysis':
+                return None
+            return apply_document_filters(collection_ref, document_filters)
+        if 'data_type' in filters:
+            collection_ref = collection_ref.where('data_type', '==', filters['data_type'])
+        return collection_ref
     
-    def _analyze_engine_performance(self, games: List[Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
-        """Analyze performance statistics for engines"""
-        engine_stats = {}
+    def _game_generations(self) -> Dict[str, Optional[str]]:
+        """games_generation of every PGN document, keyed by document ID"""
+        docs = (self.db.collection('knowledge_base')
+                .where('data_type', '==', 'pgn_analysis')
+                .select(['games_generation'])
+                .stream())
+        return {doc.id: doc.to_dict().get('games_generation') for doc in docs}
+    
+    def _game_contributions(self, document_id: str, generation: Optional[str]) -> Dict[str, Any]:
+        """Fold a document's engine_daily and head_to_head contributions from one generation of its games"""
+        query = self.db.collection(GAMES_COLLECTION).where('source_document', '==', document_id)
+        if generation:
+            query = query.where('games_generation', '==', generation)
+        docs = query.select(['white', 'black', 'result', 'game_date', 'source_document', 'games_generation']).stream()
         
-        for game in games:
-            white_engine = game['white']
-            black_engine = game['black']
-            result = game['result']
-            
-            # Initialize engine stats if not exists
-            for engine in [white_engine, black_engine]:
-                if engine not in engine_stats:
-                    engine_stats[engine] = {'wins': 0, 'draws': 0, 'losses': 0, 'total': 0}
-                engine_stats[engine]['total'] += 1
-            
-            # Update win/loss/draw counts
-            if result == '1-0':  # White wins
-                engine_stats[white_engine]['wins'] += 1
-                engine_stats[black_engine]['losses'] += 1
-            elif result == '0-1':  # Black wins
-                engine_stats[black_engine]['wins'] += 1
-                engine_stats[white_engine]['losses'] += 1
-            elif result == '1/2-1/2':  # Draw
-                engine_stats[white_engine]['draws'] += 1
-                engine_stats[black_engine]['draws'] += 1
-        
-        return engine_stats
+        engine_daily = {}
+        pairings = {}
+        for game in committed_games((doc.to_dict() for doc in docs), {document_id: generation}):
+            fold_engine_daily(engine_daily, game)
+            fold_pairings(pairings, game)
+        return {'engine_daily': engine_daily, 'head_to_head': pairings}
+    
+    def _aggregate_row_updates(self, added: List[Dict[str, Any]],
+                               replaced: Optional[List[Dict[str, Any]]] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        """Merge updates for the per-engine trend and head-to-head rows, keyed by (collection, engine)"""
+        rows = {}
+        for engine, trend_update in trend_updates(added, replaced).items():
+            rows[(TRENDS_COLLECTION, engine)] = trend_update
+        for engine, row_update in head_to_head_updates(added, replaced).items():
+            rows[(HEAD_TO_HEAD_COLLECTION, engine)] = row_update
+        return rows
+    
+    def _aggregate_row_writes(self, rows: Dict[Tuple[str, str], Dict[str, Any]],
+                              keys: List[Tuple[str, str]]) -> List[Tuple[Any, Dict[str, Any]]]:
+        """(reference, merge update) pairs for the given trend and head-to-head rows"""
+        return [(self.db.collection(collection).document(engine_document_id(engine)), rows[(collection, engine)])
+                for collection, engine in keys]
+    
+    def _aggregate_total_writes(self, added: List[Dict[str, Any]],
+                                replaced: Optional[List[Dict[str, Any]]] = None) -> List[Tuple[Any, Dict[str, Any]]]:
+        """(reference, merge update) pairs for the performance and time control totals and the data version"""
+        writes = []
+        performance_update = self._performance_aggregate_update(added, replaced)
+        if performance_update:
+            self._ensure_performance_aggregate()
+            writes.append((self._performance_aggregate_ref(), performance_update))
+        
+        time_control_aggregate = time_control_update(added, replaced)
+        if time_control_aggregate:
+            writes.append((self._time_control_aggregate_ref(), time_control_aggregate))
+        
+        # Any committed document moves the data version, so cached results keyed on it expire
+        writes.append((self._data_version_ref(), {
+            'version': firestore.Increment(1),
+            'updated_at': datetime.utcnow().isoformat()
+        }))
+        return writes
+    
+    def _commit_writes(self, writes: List[Tuple[Any, Dict[str, Any]]],
+                       merges: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        """Commit full writes and merge updates in one batch"""
+        batch = self.db.batch()
+        for reference, data in writes:
+            batch.set(reference, data)
+        for reference, data in merges:
+            batch.set(reference, data, merge=True)
+        batch.commit()
+    
+    def _revert_aggregate_rows(self, keys: List[Tuple[str, str]], added: List[Dict[str, Any]],
+                               replaced: Optional[List[Dict[str, Any]]], max_writes: int) -> None:
+        """Undo committed trend and head-to-head row updates of a commit that failed, logging rather than raising"""
+        if not keys:
+            return
+        inverse = self._aggregate_row_updates(replaced or [], added)
+        keys = [key for key in keys if key in inverse]
+        try:
+            for start in range(0, len(keys), max_writes):
+                self._commit_writes([], self._aggregate_row_writes(inverse, keys[start:start + max_writes]))
+        except Exception as e:
+            print(f"❌ Failed to revert engine trend and head-to-head rows, run rebuild_aggregates to repair them: {e}")
+    
+    def _data_version_ref(self):
+        """Document holding the knowledge base data version counter"""
+        return self.db.collection(AGGREGATES_COLLECTION).document(DATA_VERSION_DOCUMENT)
+    
+    def _write_document(self, doc_ref, document: Dict[str, Any]) -> None:
+        """Commit one knowledge base document together with its aggregate and version updates"""
+        self.commit_with_aggregates([(doc_ref, self.stored_document(document))], [document])
+    
+    def _performance_aggregate_ref(self):
+        """Document holding the running per-engine performance totals"""
+        return self.db.collection(AGGREGATES_COLLECTION).document(PERFORMANCE_AGGREGATE)
+    
+    def _time_control_aggregate_ref(self):
+        """Document holding the running per-engine, per-time-control totals"""
+        return self.db.collection(AGGREGATES_COLLECTION).document(TIME_CONTROL_AGGREGATE)
+    
+    def _ensure_performance_aggregate(self) -> None:
+        """Backfill the performance aggregate from existing documents before the first increment lands on it
+
+        An aggregate created by a merge of increments alone would miss every
+        document ingested before it existed, so one without the initialized
+        marker is rebuilt first. The documents being staged are not committed
+        yet, so the rebuild leaves them to the increments.
+        """
+        if self._performance_aggregate_ready:
+            return
+        with self._performance_aggregate_lock:
+            if self._performance_aggregate_ready:
+                return
+            snapshot = self._performance_aggregate_ref().get(field_paths=['initialized'])
+            if snapshot.exists and snapshot.to_dict().get('initialized'):
+                self._performance_aggregate_ready = True
+            else:
+                self.rebuild_performance_aggregate()
+    
+    def _performance_aggregate_update(self, added: List[Dict[str, Any]],
+                                      replaced: Optional[List[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+        """Build the merge update that moves the performance aggregate by the given documents
+
+        Documents in replaced are subtracted, so overwriting a document keeps
+        the totals exact. Returns None when nothing changes.
+        """
+        delta = {}
+        total_games = 0
+        
+        for sign, documents in ((1, added), (-1, replaced or [])):
+            for document in documents:
+                if document.get('data_type') != 'pgn_analysis':
+                    continue
+                
+                total_games += sign * document.get('total_games', 0)
+                for engine, stats in document.get('engine_performance', {}).items():
+                    engine_delta = delta.setdefault(engine, {'wins': 0, 'draws': 0, 'losses': 0, 'total': 0})
+                    for key in engine_delta:
+                        engine_delta[key] += sign * stats.get(key, 0)
+        
+        if not delta and not total_games:
+            return None
+        
+        return {
+            'engines': {
+                engine: {key: firestore.Increment(value) for key, value in engine_delta.items()}
+                for engine, engine_delta in delta.items()
+            },
+            'total_games': firestore.Increment(total_games),
+            'updated_at': datetime.utcnow().isoformat()
+        }
+    
+    def _iter_pgn_games(self, pgn_io: TextIO, analyze_moves: bool = False) -> Iterator[Dict[str, Any]]:
+        """Yield game records from a PGN stream, building move trees only when requested"""
+        return iter_game_records(pgn_io, analyze_moves)
     
     def _extract_json_metrics(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract performance metrics from JSON data"""
@@ -420,78 +1044,53 @@ class ChessEngineKnowledgeBase:
             content = blob.download_as_text()
             print(f"✅ Loaded {len(content)} characters from {file_path}")
             return content
-            
+        
         except Exception as e:
             print(f"❌ Error loading from storage: {e}")
             return None
     
-    def list_storage_files(self, prefix: str = "") -> List[str]:
-        """List files in Firebase Storage bucket"""
+    def list_storage_files_page(self, prefix: str = "", page_size: int = STORAGE_PAGE_SIZE,
+                                page_token: Optional[str] = None) -> Dict[str, Any]:
+        """One page of file names under a prefix in name order, with the token for the next page
+
+        The token carries the last name returned and the listing resumes from
+        it server-side, so no page reads more than one name past its end.
+        next_page_token is None on the last page. Raises ValueError for a
+        malformed page token.
+        """
+        after = decode_page_token(page_token, 1)[0] if page_token else None
         try:
             if not self.bucket:
-                return []
+                return {'files': [], 'next_page_token': None}
             
-            blobs = self.bucket.list_blobs(prefix=prefix)
-            files = [blob.name for blob in blobs]
-            print(f"📁 Found {len(files)} files with prefix '{prefix}'")
-            return files
+            # start_offset is inclusive, so the listing may begin with the previous page's last name
+            blobs = self.bucket.list_blobs(prefix=prefix, start_offset=after, max_results=page_size + 2)
+            files = []
+            next_page_token = None
+            for blob in blobs:
+                if blob.name == after:
+                    continue
+                if len(files) == page_size:
+                    next_page_token = encode_page_token([files[-1]])
+                    break
+                files.append(blob.name)
             
+            print(f"📁 Listed {len(files)} files with prefix '{prefix}'")
+            return {'files': files, 'next_page_token': next_page_token}
+        
         except Exception as e:
             print(f"❌ Error listing storage files: {e}")
-            return []
+            return {'files': [], 'next_page_token': None}
     
-    def auto_ingest_from_storage(self, prefix: str = "") -> Dict[str, Any]:
-        """Automatically ingest all supported files from storage"""
+    def auto_ingest_from_storage(self, prefix: str = "", force: bool = False, progress=None) -> Dict[str, Any]:
+        """Automatically ingest new or changed supported files from storage"""
         try:
-            files = self.list_storage_files(prefix)
-            
-            results = {
-                'processed': 0,
-                'errors': 0,
-                'skipped': 0,
-                'details': []
-            }
-            
-            for file_path in files:
-                # Skip directories and unsupported files
-                if file_path.endswith('/'):
-                    continue
-                
-                file_ext = file_path.lower().split('.')[-1]
-                
-                if file_ext not in ['pgn', 'json', 'md']:
-                    results['skipped'] += 1
-                    continue
-                
-                content = self.load_data_from_storage(file_path)
-                if not content:
-                    results['errors'] += 1
-                    results['details'].append(f"Failed to load: {file_path}")
-                    continue
-                
-                # Process based on file type
-                metadata = {'fileName': file_path.split('/')[-1]}
-                
-                if file_ext == 'pgn':
-                    result = self.ingest_pgn_data(content, metadata)
-                elif file_ext == 'json':
-                    result = self.ingest_json_data(content, metadata)
-                elif file_ext == 'md':
-                    result = self.ingest_markdown_data(content, metadata)
-                
-                if result.get('success'):
-                    results['processed'] += 1
-                    results['details'].append(f"Processed: {file_path}")
-                else:
-                    results['errors'] += 1
-                    results['details'].append(f"Error processing {file_path}: {result.get('error', 'Unknown error')}")
-            
-            return results
-            
+            return StorageIngestPipeline(self, progress=progress).run(prefix, force)
+        
         except Exception as e:
             return {
                 'processed': 0,
                 'errors': 1,
                 'skipped': 0,
                 'details': [f"Auto-ingest failed: {str(e)}"]
-            }
\ No newline at end of file
+            }
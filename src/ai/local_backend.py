@@ -0,0 +1,401 @@
+"""
+Chess Engine Metrics AI - Local Backend
+SQLite document store and filesystem bucket for offline, local-disk-speed runs
+
+Both classes implement the subset of the Firestore and Cloud Storage client
+APIs the knowledge base uses, so the rest of the code runs unchanged against
+either backend.
+"""
+
+import os
+import copy
+import json
+import uuid
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterator, Tuple
+from google.cloud import firestore
+
+_COMPARISONS = {
+    '==': '=',
+    '!=': '!=',
+    '<': '<',
+    '<=': '<=',
+    '>': '>',
+    '>=': '>='
+}
+
+
+def _merge_into(target: Dict[str, Any], updates: Dict[str, Any]) -> None:
+    """Apply a merge write, resolving Increment and DELETE_FIELD transforms against existing values"""
+    for key, value in updates.items():
+        if value is firestore.DELETE_FIELD:
+            target.pop(key, None)
+        elif isinstance(value, firestore.Increment):
+            current = target.get(key)
+            target[key] = (current if isinstance(current, (int, float)) else 0) + value.value
+        elif isinstance(value, dict):
+            if not isinstance(target.get(key), dict):
+                target[key] = {}
+            _merge_into(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+
+
+def _resolve_transforms(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace Increment transforms in a full write with their values"""
+    resolved = {}
+    _merge_into(resolved, data)
+    return resolved
+
+
+def _project(data: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Keep only the selected top-level fields"""
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields if field in data}
+
+
+class LocalSnapshot:
+    """Document snapshot returned by gets and queries"""
+    
+    def __init__(self, reference: 'LocalDocumentReference', data: Optional[Dict[str, Any]]):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+    
+    def to_dict(self) -> Optional[Dict[str, Any]]:
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class LocalDocumentReference:
+    """Reference to one document in a local collection"""
+    
+    def __init__(self, store: 'LocalDocumentStore', collection: str, doc_id: Optional[str] = None):
+        self.store = store
+        self.collection = collection
+        self.id = doc_id or uuid.uuid4().hex[:20]
+    
+    def get(self, field_paths: Optional[List[str]] = None) -> LocalSnapshot:
+        data = self.store._read(self.collection, self.id)
+        return LocalSnapshot(self, _project(data, field_paths) if data is not None else None)
+    
+    def set(self, data: Dict[str, Any], merge: bool = False) -> None:
+        self.store._apply([('set', self, data, merge)])
+    
+    def delete(self) -> None:
+        self.store._apply([('delete', self, None, False)])
+
+
+class LocalQuery:
+    """Immutable query over a local collection, translated to SQL on stream()"""
+    
+    def __init__(self, store: 'LocalDocumentStore', collection: str):
+        self.store = store
+        self.collection = collection
+        self._filters: List[Tuple[str, str, Any]] = []
+        self._order: List[Tuple[str, str]] = []
+        self._fields: Optional[List[str]] = None
+        self._limit: Optional[int] = None
+        self._start_after: Optional[Tuple[Dict[str, Any], Optional[str]]] = None
+    
+    def _copy(self) -> 'LocalQuery':
+        query = LocalQuery(self.store, self.collection)
+        query._filters = list(self._filters)
+        query._order = list(self._order)
+        query._fields = self._fields
+        query._limit = self._limit
+        query._start_after = self._start_after
+        return query
+    
+    def where(self, field: str, op: str, value: Any) -> 'LocalQuery':
+        query = self._copy()
+        query._filters.append((field, op, value))
+        return query
+    
+    def order_by(self, field: str, direction: str = firestore.Query.ASCENDING) -> 'LocalQuery':
+        query = self._copy()
+        query._order.append((field, direction))
+        return query
+    
+    def select(self, fields: List[str]) -> 'LocalQuery':
+        query = self._copy()
+        query._fields = list(fields)
+        return query
+    
+    def limit(self, count: int) -> 'LocalQuery':
+        query = self._copy()
+        query._limit = count
+        return query
+    
+    def start_after(self, document_fields_or_snapshot) -> 'LocalQuery':
+        """Resume after a document snapshot, or after the given values of the ordered fields"""
+        query = self._copy()
+        if isinstance(document_fields_or_snapshot, LocalSnapshot):
+            query._start_after = (document_fields_or_snapshot.to_dict() or {}, document_fields_or_snapshot.id)
+        else:
+            query._start_after = (dict(document_fields_or_snapshot), None)
+        return query
+    
+    def count(self, alias: Optional[str] = None) -> 'LocalAggregationQuery':
+        return LocalAggregationQuery(self, alias or 'count')
+    
+    def stream(self) -> Iterator[LocalSnapshot]:
+        sql, params = self._sql("SELECT id, data")
+        for doc_id, data in self.store._query(sql, params):
+            reference = LocalDocumentReference(self.store, self.collection, doc_id)
+            yield LocalSnapshot(reference, _project(json.loads(data), self._fields))
+    
+    def _sql(self, columns: str) -> Tuple[str, List[Any]]:
+        """SQL and parameters selecting the given columns of the matching documents"""
+        sql = f"{columns} FROM documents WHERE collection = ?"
+        params: List[Any] = [self.collection]
+        
+        for field, op, value in self._filters:
+            path = f"$.{field}"
+            if op == 'array_contains':
+                sql += " AND EXISTS (SELECT 1 FROM json_each(data, ?) WHERE value = ?)"
+                params.extend([path, value])
+            elif op == 'array_contains_any':
+                sql += f" AND EXISTS (SELECT 1 FROM json_each(data, ?) WHERE value IN ({', '.join('?' for _ in value)}))"
+                params.extend([path, *value])
+            elif op == 'in':
+                sql += f" AND json_extract(data, ?) IN ({', '.join('?' for _ in value)})"
+                params.extend([path, *value])
+            else:
+                sql += f" AND json_extract(data, ?) {_COMPARISONS[op]} ?"
+                params.extend([path, value])
+        
+        # Like Firestore, documents missing an ordered field are excluded
+        order_clauses = []
+        for field, direction in self._order:
+            sql += " AND json_extract(data, ?) IS NOT NULL"
+            params.append(f"$.{field}")
+            descending = direction == firestore.Query.DESCENDING
+            order_clauses.append(f"json_extract(data, '$.{field}') {'DESC' if descending else 'ASC'}")
+        order_clauses.append("id ASC")
+        
+        if self._start_after is not None:
+            # Rows strictly after the cursor in (ordered fields..., id) order
+            values, doc_id = self._start_after
+            keys = [(f"json_extract(data, '$.{field}')", values.get(field), direction == firestore.Query.DESCENDING)
+                    for field, direction in self._order]
+            if doc_id is not None:
+                keys.append(("id", doc_id, False))
+            alternatives = []
+            for index, (expression, value, descending) in enumerate(keys):
+                terms = [f"{equal} = ?" for equal, _, _ in keys[:index]]
+                terms.append(f"{expression} {'<' if descending else '>'} ?")
+                alternatives.append("(" + " AND ".join(terms) + ")")
+                params.extend([key_value for _, key_value, _ in keys[:index]] + [value])
+            if alternatives:
+                sql += " AND (" + " OR ".join(alternatives) + ")"
+        
+        sql += " ORDER BY " + ", ".join(order_clauses)
+        
+        if self._limit is not None:
+            sql += " LIMIT ?"
+            params.append(self._limit)
+        return sql, params
+
+
+class LocalAggregationResult:
+    """One aggregate value, shaped like Firestore's AggregationResult"""
+    
+    def __init__(self, alias: str, value: int):
+        self.alias = alias
+        self.value = value
+
+
+class LocalAggregationQuery:
+    """Count of the documents a query matches, computed without loading them"""
+    
+    def __init__(self, query: LocalQuery, alias: str):
+        self.query = query
+        self.alias = alias
+    
+    def get(self) -> List[List[LocalAggregationResult]]:
+        sql, params = self.query._sql("SELECT id")
+        count = self.query.store._query(f"SELECT COUNT(*) FROM ({sql})", params)[0][0]
+        return [[LocalAggregationResult(self.alias, count)]]
+
+
+class LocalCollection(LocalQuery):
+    """Local collection: a query with no constraints that can also create documents"""
+    
+    def document(self, doc_id: Optional[str] = None) -> LocalDocumentReference:
+        return LocalDocumentReference(self.store, self.collection, doc_id)
+    
+    def add(self, data: Dict[str, Any]) -> Tuple[datetime, LocalDocumentReference]:
+        reference = self.document()
+        reference.set(data)
+        return datetime.utcnow(), reference
+
+
+class LocalWriteBatch:
+    """Write batch applied atomically in one SQLite transaction"""
+    
+    def __init__(self, store: 'LocalDocumentStore'):
+        self.store = store
+        self._writes = []
+    
+    def set(self, reference: LocalDocumentReference, data: Dict[str, Any], merge: bool = False) -> None:
+        self._writes.append(('set', reference, data, merge))
+    
+    def delete(self, reference: LocalDocumentReference) -> None:
+        self._writes.append(('delete', reference, None, False))
+    
+    def commit(self) -> None:
+        self.store._apply(self._writes)
+        self._writes = []
+
+
+class LocalDocumentStore:
+    """Firestore-compatible document store kept in a single SQLite file"""
+    
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "collection TEXT NOT NULL, id TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (collection, id))"
+        )
+    
+    def collection(self, name: str) -> LocalCollection:
+        return LocalCollection(self, name)
+    
+    def batch(self) -> LocalWriteBatch:
+        return LocalWriteBatch(self)
+    
+    def get_all(self, references: List[LocalDocumentReference],
+                field_paths: Optional[List[str]] = None) -> Iterator[LocalSnapshot]:
+        for reference in references:
+            yield reference.get(field_paths)
+    
+    def _read(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection, doc_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def _query(self, sql: str, params: List[Any]) -> List[Tuple[str, str]]:
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+    
+    def _apply(self, writes: List[Tuple[str, LocalDocumentReference, Any, bool]]) -> None:
+        """Apply writes in one transaction so a batch lands all-or-nothing"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for action, reference, data, merge in writes:
+                    key = (reference.collection, reference.id)
+                    if action == 'delete':
+                        self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", key)
+                        continue
+                    
+                    if merge:
+                        row = self._conn.execute(
+                            "SELECT data FROM documents WHERE collection = ? AND id = ?", key
+                        ).fetchone()
+                        document = json.loads(row[0]) if row else {}
+                        _merge_into(document, data)
+                    else:
+                        document = _resolve_transforms(data)
+                    
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+                        (*key, json.dumps(document, default=str))
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+class LocalBlob:
+    """File in the local bucket directory, exposing the Blob attributes ingestion reads"""
+    
+    def __init__(self, bucket: 'LocalBucket', name: str):
+        self.bucket = bucket
+        self.name = name
+        self.path = os.path.join(bucket.root, *name.split('/'))
+        self.size = None
+        self.generation = None
+        self.etag = None
+        self.md5_hash = None
+        if os.path.isfile(self.path):
+            self.reload()
+    
+    def reload(self) -> None:
+        """Refresh size and version metadata from the file system"""
+        stat = os.stat(self.path)
+        self.size = stat.st_size
+        self.generation = stat.st_mtime_ns
+        self.etag = hashlib.md5(f"{self.name}:{stat.st_size}:{stat.st_mtime_ns}".encode('utf-8')).hexdigest()
+    
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+    
+    def download_as_text(self, encoding: str = 'utf-8') -> str:
+        with open(self.path, 'r', encoding=encoding) as handle:
+            return handle.read()
+    
+    def open(self, mode: str = 'r', chunk_size: Optional[int] = None, encoding: str = 'utf-8', **kwargs):
+        return open(self.path, mode, encoding=encoding if 'b' not in mode else None,
+                    buffering=chunk_size or -1)
+
+
+class LocalBucket:
+    """Directory standing in for the Firebase Storage bucket"""
+    
+    def __init__(self, root: str):
+        self.root = root
+        self.name = os.path.basename(os.path.abspath(root))
+        os.makedirs(root, exist_ok=True)
+    
+    def exists(self) -> bool:
+        return os.path.isdir(self.root)
+    
+    def blob(self, name: str) -> LocalBlob:
+        return LocalBlob(self, name)
+    
+    def list_blobs(self, prefix: str = "", start_offset: Optional[str] = None,
+                   max_results: Optional[int] = None, **kwargs) -> Iterator[LocalBlob]:
+        """Yield files whose relative path starts with prefix, in lexicographic name order like Cloud Storage
+
+        start_offset skips names before it; max_results stops after that many.
+        Directories are walked lazily, so listing never holds every name.
+        """
+        names = self._walk(self.root, '', prefix, start_offset or '')
+        for count, name in enumerate(names):
+            if max_results is not None and count >= max_results:
+                return
+            yield LocalBlob(self, name)
+    
+    def _walk(self, directory: str, relative: str, prefix: str, start_offset: str) -> Iterator[str]:
+        """Names under a directory in lexicographic order, skipping subtrees outside prefix or before start_offset"""
+        entries = []
+        with os.scandir(directory) as scan:
+            for entry in scan:
+                # A directory's names all sort as its name followed by '/'
+                is_directory = entry.is_dir()
+                name = f"{relative}{entry.name}/" if is_directory else f"{relative}{entry.name}"
+                entries.append((name, is_directory, entry.path))
+        
+        for name, is_directory, path in sorted(entries):
+            if is_directory:
+                if not (name.startswith(prefix) or prefix.startswith(name)):
+                    continue
+                if name < start_offset and not start_offset.startswith(name):
+                    continue
+                yield from self._walk(path, name, prefix, start_offset)
+            elif name.startswith(prefix) and name >= start_offset:
+                yield name
@@ -0,0 +1,46 @@
+"""
+Chess Engine Metrics AI - Pagination
+Opaque page tokens and page size limits for cursor-paginated listings
+"""
+
+import json
+import base64
+from typing import List, Optional, Any
+
+# Knowledge base documents per page: default and most a caller may ask for
+DOCUMENT_PAGE_SIZE = 50
+MAX_DOCUMENT_PAGE_SIZE = 500
+
+# Storage file names per page: default and most a caller may ask for
+STORAGE_PAGE_SIZE = 1000
+MAX_STORAGE_PAGE_SIZE = 5000
+
+
+def encode_page_token(cursor: List[Any]) -> str:
+    """Opaque URL-safe token carrying the cursor values of the last item on a page"""
+    return base64.urlsafe_b64encode(json.dumps(cursor).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_page_token(token: str, length: int) -> List[Any]:
+    """Cursor values from a page token, raising ValueError if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        cursor = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid page token")
+    if not isinstance(cursor, list) or len(cursor) != length:
+        raise ValueError("Invalid page token")
+    return cursor
+
+
+def page_size(value: Optional[Any], default: int, maximum: int) -> int:
+    """Validate a requested page size, raising ValueError outside 1..maximum"""
+    if value is None or value == '':
+        return default
+    try:
+        size = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"page_size must be an integer, got {value}")
+    if not 1 <= size <= maximum:
+        raise ValueError(f"page_size must be between 1 and {maximum}")
+    return size
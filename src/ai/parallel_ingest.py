@@ -0,0 +1,136 @@
+"""
+Chess Engine Metrics AI - Parallel PGN Ingestion
+Parses PGN shards split at game boundaries in a process pool
+"""
+
+import io
+import os
+import atexit
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, Optional, TextIO, Tuple
+from pgn_scanner import iter_game_records, fold_engine_stats
+from trends import fold_engine_daily, DailyCounts
+from head_to_head import fold_pairings, Pairings
+from time_controls import fold_time_control_stats, TimeControlCounts
+
+# Worker processes used for PGN parsing (1 keeps parsing in the request thread)
+PGN_PARSE_WORKERS = int(os.getenv('PGN_PARSE_WORKERS', os.cpu_count() or 1))
+
+# Approximate size of the text handed to each worker
+PGN_SHARD_BYTES = int(os.getenv('PGN_SHARD_BYTES', 4 * 1024 * 1024))
+
+# Parser processes are never forked from the service process, whose gRPC and HTTP client
+# threads could leave a forked child holding their locks; spawn is the fallback where
+# forkserver is unavailable (Windows)
+PGN_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+ShardResult = Tuple[List[Dict[str, Any]], int, Dict[str, Dict[str, int]], DailyCounts, Pairings,
+                    TimeControlCounts]
+
+
+def _get_executor(workers: int) -> ProcessPoolExecutor:
+    """Return the shared process pool for the given worker count"""
+    with _executors_lock:
+        if workers not in _executors:
+            _executors[workers] = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context(PGN_START_METHOD))
+        return _executors[workers]
+
+
+@atexit.register
+def shutdown_executors() -> None:
+    """Shut down every shared process pool, waiting for their workers to exit"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_pgn_shards(pgn_io: TextIO, shard_bytes: int = PGN_SHARD_BYTES) -> Iterator[str]:
+    """Split a PGN stream into shards of roughly shard_bytes at [Event game boundaries
+
+    A shard only ends before an [Event tag that follows an empty line after
+    movetext, which is exactly where chess.pgn.read_game ends a game, so parsing
+    the shards one after another yields the same games as parsing the stream.
+    """
+    lines = []
+    size = 0
+    previous_blank = False
+    in_headers = False
+    
+    for line in iter(pgn_io.readline, ''):
+        if size >= shard_bytes and previous_blank and not in_headers and line.startswith('[Event '):
+            yield ''.join(lines)
+            lines = []
+            size = 0
+        
+        lines.append(line)
+        size += len(line)
+        previous_blank = line.isspace()
+        if not previous_blank:
+            in_headers = line.startswith('[')
+    
+    if lines:
+        yield ''.join(lines)
+
+
+def parse_pgn_shard(shard: str, analyze_moves: bool = False, keep_games: bool = False) -> ShardResult:
+    """Parse one shard into (game records, game count, engine statistics, daily counts, pairings, time control counts)
+
+    Game records are only returned when keep_games is set.
+    """
+    engine_stats = {}
+    engine_daily = {}
+    pairings = {}
+    time_control_stats = {}
+    games = []
+    total_games = 0
+    
+    for game_data in iter_game_records(io.StringIO(shard), analyze_moves):
+        fold_engine_stats(engine_stats, game_data)
+        fold_engine_daily(engine_daily, game_data)
+        fold_pairings(pairings, game_data)
+        fold_time_control_stats(time_control_stats, game_data)
+        if keep_games:
+            games.append(game_data)
+        total_games += 1
+    
+    return games, total_games, engine_stats, engine_daily, pairings, time_control_stats
+
+
+def merge_engine_stats(engine_stats: Dict[str, Dict[str, int]],
+                       shard_stats: Dict[str, Dict[str, int]]) -> None:
+    """Merge shard statistics into running totals, keeping first-seen engine order"""
+    for engine, stats in shard_stats.items():
+        if engine not in engine_stats:
+            engine_stats[engine] = {'wins': 0, 'draws': 0, 'losses': 0, 'total': 0}
+        for key in ('wins', 'draws', 'losses', 'total'):
+            engine_stats[engine][key] += stats.get(key, 0)
+
+
+def parse_pgn_parallel(pgn_io: TextIO, analyze_moves: bool = False, keep_games: bool = False,
+                       workers: Optional[int] = None,
+                       shard_bytes: int = PGN_SHARD_BYTES) -> Iterator[ShardResult]:
+    """Parse a PGN stream across worker processes, yielding shard results in input order
+
+    At most two shards per worker are in flight, so memory stays bounded for
+    streamed input.
+    """
+    workers = workers or PGN_PARSE_WORKERS
+    executor = _get_executor(workers)
+    pending = deque()
+    
+    for shard in iter_pgn_shards(pgn_io, shard_bytes):
+        pending.append(executor.submit(parse_pgn_shard, shard, analyze_moves, keep_games))
+        if len(pending) >= workers * 2:
+            yield pending.popleft().result()
+    
+    while pending:
+        yield pending.popleft().result()
@@ -0,0 +1,188 @@
+"""
+Chess Engine Metrics AI - PGN Scanner
+Fast header and ply-count scanning of PGN text without building game trees
+"""
+
+from typing import Dict, Iterator, Optional, Any, TextIO, Tuple
+import chess.pgn
+from time_controls import parse_time_control
+
+# Tags python-chess fills in for every game, so scanned headers match parsed ones
+SEVEN_TAG_ROSTER = {
+    'Event': '?',
+    'Site': '?',
+    'Date': '????.??.??',
+    'Round': '?',
+    'White': '?',
+    'Black': '?',
+    'Result': '*'
+}
+
+
+def read_game_headers(handle: TextIO) -> Optional[Tuple[Dict[str, str], int]]:
+    """Read the next game's headers and mainline ply count, skipping move validation.
+
+    Mirrors the line handling of chess.pgn.read_game so games split and headers
+    resolve identically, but SAN tokens are only counted, never replayed on a
+    board. For well-formed movetext the ply count equals
+    len(list(game.mainline_moves())).
+    """
+    line = handle.readline().lstrip("\ufeff")
+    while line.isspace() or line.startswith("%") or line.startswith(";"):
+        line = handle.readline()
+    
+    headers = dict(SEVEN_TAG_ROSTER)
+    found_game = False
+    consecutive_empty_lines = 0
+    
+    # Parse game headers
+    while line:
+        if line.startswith("%") or line.startswith(";"):
+            line = handle.readline()
+            continue
+        
+        if consecutive_empty_lines < 1 and line.isspace():
+            consecutive_empty_lines += 1
+            line = handle.readline()
+            continue
+        
+        found_game = True
+        if not line.startswith("["):
+            break
+        
+        consecutive_empty_lines = 0
+        tag_match = chess.pgn.TAG_REGEX.match(line)
+        if tag_match:
+            headers[tag_match.group(1)] = tag_match.group(2)
+        
+        line = handle.readline()
+    
+    if not found_game:
+        return None
+    
+    # Count mainline moves
+    ply_count = 0
+    variation_depth = 0
+    fresh_line = True
+    while line:
+        if fresh_line:
+            if line.startswith("%") or line.startswith(";"):
+                line = handle.readline()
+                continue
+            # An empty line means the end of a game
+            if line.isspace():
+                break
+        fresh_line = True
+        
+        for match in chess.pgn.MOVETEXT_REGEX.finditer(line):
+            token = match.group(0)
+            
+            if token.startswith("{"):
+                # Consume until the end of the comment, then resume on that line
+                line = token[1:]
+                while line and "}" not in line:
+                    line = handle.readline()
+                if line:
+                    line = line[line.find("}") + 1:]
+                fresh_line = False
+                break
+            elif token == "(":
+                if variation_depth or ply_count:
+                    variation_depth += 1
+            elif token == ")":
+                if variation_depth:
+                    variation_depth -= 1
+            elif variation_depth:
+                continue
+            elif token.startswith(";"):
+                break
+            elif match.group(1):
+                ply_count += 1
+        
+        if fresh_line:
+            line = handle.readline()
+    
+    return headers, ply_count
+
+
+def scan_pgn_games(handle: TextIO) -> Iterator[Tuple[Dict[str, str], int]]:
+    """Yield (headers, ply_count) for every game in a PGN handle"""
+    while True:
+        scanned = read_game_headers(handle)
+        if scanned is None:
+            break
+        yield scanned
+
+
+def parse_elo(elo_str: str) -> Optional[int]:
+    """Parse ELO rating from string"""
+    try:
+        return int(elo_str) if elo_str != '?' else None
+    except (ValueError, TypeError):
+        return None
+
+
+def build_game_record(headers, ply_count: int) -> Dict[str, Any]:
+    """Build the stored game record from PGN headers and a ply count"""
+    time_control = headers.get('TimeControl', 'Unknown')
+    parsed_time_control = parse_time_control(time_control)
+    return {
+        'white': headers.get('White', 'Unknown'),
+        'black': headers.get('Black', 'Unknown'),
+        'result': headers.get('Result', '*'),
+        'date': headers.get('Date', '????.??.??'),
+        'event': headers.get('Event', 'Unknown'),
+        'round': headers.get('Round', '?'),
+        'time_control': time_control,
+        'time_control_category': parsed_time_control.category,
+        'base_seconds': parsed_time_control.base_seconds,
+        'increment_seconds': parsed_time_control.increment_seconds,
+        'white_elo': parse_elo(headers.get('WhiteElo', '?')),
+        'black_elo': parse_elo(headers.get('BlackElo', '?')),
+        'moves': ply_count,
+        'termination': headers.get('Termination', 'Unknown')
+    }
+
+
+def iter_game_records(pgn_io: TextIO, analyze_moves: bool = False) -> Iterator[Dict[str, Any]]:
+    """Yield game records from a PGN stream, building move trees only when requested"""
+    if analyze_moves:
+        while True:
+            game = chess.pgn.read_game(pgn_io)
+            if game is None:
+                break
+            
+            try:
+                yield build_game_record(game.headers, len(list(game.mainline_moves())))
+            except Exception as e:
+                print(f"Error extracting game data: {e}")
+    else:
+        for headers, ply_count in scan_pgn_games(pgn_io):
+            try:
+                yield build_game_record(headers, ply_count)
+            except Exception as e:
+                print(f"Error extracting game data: {e}")
+
+
+def fold_engine_stats(engine_stats: Dict[str, Dict[str, int]], game: Dict[str, Any]) -> None:
+    """Fold a single game result into running engine statistics"""
+    white_engine = game['white']
+    black_engine = game['black']
+    result = game['result']
+    
+    # Initialize engine stats if not exists
+    for engine in [white_engine, black_engine]:
+        if engine not in engine_stats:
+            engine_stats[engine] = {'wins': 0, 'draws': 0, 'losses': 0, 'total': 0}
+        engine_stats[engine]['total'] += 1
+    
+    # Update win/loss/draw counts
+    if result == '1-0':  # White wins
+        engine_stats[white_engine]['wins'] += 1
+        engine_stats[black_engine]['losses'] += 1
+    elif result == '0-1':  # Black wins
+        engine_stats[black_engine]['wins'] += 1
+        engine_stats[white_engine]['losses'] += 1
+    elif result == '1/2-1/2':  # Draw
+        engine_stats[white_engine]['draws'] += 1
+        engine_stats[black_engine]['draws'] += 1
@@ -4,40 +4,127 @@ Handles natural language queries and generates intelligent responses
 """
 
 import os
-import re
 import json
+from itertools import combinations
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from knowledge_base import ChessEngineKnowledgeBase
+from response_cache import ResponseCache
+from intent_matcher import IntentMatcher
 import numpy as np
 
+# Data each response generator reads; a query retrieves only what its intent's generator needs.
+# Responses cite how many documents back them, which a count aggregation answers without reading any
+RESPONSE_DEPENDENCIES = {
+    'comparison': ['performance', 'document_count', 'ratings', 'head_to_head'],
+    'trend_analysis': ['performance', 'document_count', 'trend'],
+    'problem_diagnosis': ['document_count'],
+    'best_performer': ['performance', 'document_count', 'ratings'],
+    'factor_analysis': ['performance', 'document_count'],
+    'general': ['performance', 'document_count']
+}
+
+# Threads running a query's independent reads in parallel, shared by all requests
+RETRIEVAL_WORKERS = int(os.getenv('RETRIEVAL_WORKERS', 8))
+
+# Days per trend comparison window, by the duration a query asks about
+TREND_WINDOW_DAYS = {
+    '1 week': 7,
+    '1 month': 30,
+    'default': 28
+}
+
+# Engines whose pairwise head-to-head records a comparison reports
+HEAD_TO_HEAD_MAX_ENGINES = 4
+
+# Engines a trend question reports on, one series each (e.g. every version of a family)
+TREND_MAX_ENGINES = 4
+
+# Most queries answered by one /api/query/batch request
+QUERY_BATCH_MAX = int(os.getenv('QUERY_BATCH_MAX', 20))
+
+# Engines recognized in queries until ingested games populate the engine registry
+DEFAULT_ENGINE_NAMES = ['V7P3R', 'SlowMate', 'C0BR4', 'COBRA']
+
 class ChessEngineQueryProcessor:
-    def __init__(self, project_id: Optional[str] = None):
-        """Initialize the query processor"""
-        self.knowledge_base = ChessEngineKnowledgeBase(project_id)
-        self.engine_names = ['V7P3R', 'SlowMate', 'C0BR4', 'COBRA']
-        
+    def __init__(self, project_id: Optional[str] = None,
+                 knowledge_base: Optional[ChessEngineKnowledgeBase] = None,
+                 response_cache: Optional[ResponseCache] = None):
+        """Initialize the query processor, sharing an existing knowledge base when given"""
+        self.knowledge_base = knowledge_base or ChessEngineKnowledgeBase(project_id)
+        self.response_cache = response_cache or ResponseCache()
+        self.engine_names = list(DEFAULT_ENGINE_NAMES)
+        self.intent_matcher = IntentMatcher(self.engine_names)
+        self._engine_registry = None
+        self._retrieval_pool = ThreadPoolExecutor(RETRIEVAL_WORKERS, thread_name_prefix='retrieval')
+    
     def process_query(self, query: str, user_id: Optional[str] = None) -> Dict[str, Any]:
         """Process a natural language query and return structured response"""
+        # One data version read keys both the engine registry and the response cache
+        version_available, data_version = self._read_data_version()
+        if version_available:
+            self._refresh_engine_names(data_version)
+        
+        return self._answer_query(query, version_available, data_version)
+    
+    def process_queries(self, queries: List[str], user_id: Optional[str] = None) -> Dict[str, Any]:
+        """Answer several queries in one pass, sharing a single data retrieval between them
+
+        The data version is read and the engine registry refreshed once for
+        the whole batch. Every knowledge base read is made at most once: the
+        first query that needs a summary, document list, trend, rating fit or
+        head-to-head record loads it and later queries reuse it. Results come
+        back in query order, each shaped like a process_query result.
+        """
+        version_available, data_version = self._read_data_version()
+        if version_available:
+            self._refresh_engine_names(data_version)
+        
+        shared: Dict[Tuple, Any] = {}
+        results = [self._answer_query(query, version_available, data_version, shared) for query in queries]
+        
+        return {
+            'success': True,
+            'results': results,
+            'data_reads': len(shared),
+            'timestamp': datetime.utcnow().isoformat()
+        }
+    
+    def _answer_query(self, query: str, version_available: bool, data_version: Optional[int],
+                      shared: Optional[Dict[Tuple, Any]] = None) -> Dict[str, Any]:
+        """Answer one query from the response cache or freshly retrieved data"""
         try:
             # Analyze query intent
             query_intent = self._analyze_query_intent(query)
             
-            # Retrieve relevant data
-            relevant_data = self._retrieve_relevant_data(query_intent)
+            # Responses depend only on the intent and the data, so reuse one while both are unchanged
+            cache_key = (json.dumps(query_intent, sort_keys=True), data_version) if version_available else None
+            cached = self.response_cache.get(cache_key) if cache_key else None
             
-            # Generate response
-            response = self._generate_response(query, query_intent, relevant_data)
+            if cached:
+                response, data_sources = cached
+            else:
+                # Retrieve relevant data
+                relevant_data = self._retrieve_relevant_data(query_intent, shared)
+                
+                # Generate response
+                response = self._generate_response(query, query_intent, relevant_data)
+                data_sources = len(relevant_data)
+                
+                if cache_key:
+                    self.response_cache.put(cache_key, (response, data_sources))
             
             return {
                 'success': True,
                 'query': query,
                 'intent': query_intent,
                 'response': response,
-                'data_sources': len(relevant_data),
+                'data_sources': data_sources,
+                'cached': cached is not None,
                 'timestamp': datetime.utcnow().isoformat()
             }
-            
+        
         except Exception as e:
             return {
                 'success': False,
@@ -46,105 +133,183 @@ class ChessEngineQueryProcessor:
                 'timestamp': datetime.utcnow().isoformat()
             }
     
+    def _read_data_version(self) -> Tuple[bool, Optional[int]]:
+        """Read the knowledge base data version as (available, version)
+
+        Ingest commits bump the data version, so cached responses are never
+        served for older data. When it cannot be read, responses are not
+        cached and the engine names stay as they are.
+        """
+        try:
+            if not self.knowledge_base.db:
+                return False, None
+            return True, self.knowledge_base.data_version()
+        except Exception as e:
+            print(f"Data version lookup failed, skipping response cache: {e}")
+            return False, None
+    
+    def _refresh_engine_names(self, data_version: Optional[int]) -> None:
+        """Rebuild the intent matcher when the engine registry has changed
+
+        Queries then recognize every ingested engine by its full name or by
+        any versionless spelling of its family (COBRA, C0BR4).
+        """
+        try:
+            registry = self.knowledge_base.get_engine_registry(data_version)
+        except Exception as e:
+            print(f"Engine registry lookup failed, keeping known engines: {e}")
+            return
+        
+        if registry is self._engine_registry:
+            return
+        
+        if len(registry):
+            self.intent_matcher = IntentMatcher(registry.names, engine_aliases=registry.aliases())
+            self.engine_names = list(registry.names)
+        else:
+            self.intent_matcher = IntentMatcher(DEFAULT_ENGINE_NAMES)
+            self.engine_names = list(DEFAULT_ENGINE_NAMES)
+        self._engine_registry = registry
+    
     def _analyze_query_intent(self, query: str) -> Dict[str, Any]:
         """Analyze query to determine intent and extract entities"""
-        query_lower = query.lower()
-        
-        intent = {
-            'type': 'general',
-            'engines': [],
-            'time_frame': None,
-            'performance_aspect': 'overall',
-            'comparison': False,
-            'trend_analysis': False,
-            'problem_diagnosis': False
+        return self.intent_matcher.match(query)
+    
+    def _retrieve_relevant_data(self, query_intent: Dict[str, Any],
+                                shared: Optional[Dict[Tuple, Any]] = None) -> Dict[str, Any]:
+        """Retrieve the data the intent's response generator declares, reusing reads already made for the batch in shared
+
+        The declared reads run in parallel on the retrieval pool. A read that
+        fails leaves its part of the data empty instead of failing the whole
+        response.
+        """
+        data = {
+            'performance_summary': {'engines': {}, 'total_games_analyzed': 0},
+            'document_count': 0,
+            'trend': {},
+            'trend_since': None,
+            'ratings': None,
+            'head_to_head': [],
+            'time_control': None,
+            'relevant_engines': query_intent.get('engines', []),
+            'data_available': False
         }
         
-        # Extract engine names
-        for engine in self.engine_names:
-            if engine.lower() in query_lower:
-                intent['engines'].append(engine)
-        
-        # Determine query type
-        if any(word in query_lower for word in ['compare', 'vs', 'versus', 'comparison']):
-            intent['type'] = 'comparison'
-            intent['comparison'] = True
-        
-        elif any(word in query_lower for word in ['improve', 'trend', 'over time', 'since', 'progress']):
-            intent['type'] = 'trend_analysis'
-            intent['trend_analysis'] = True
-        
-        elif any(word in query_lower for word in ['drop', 'worse', 'problem', 'issue', 'decline', 'regression']):
-            intent['type'] = 'problem_diagnosis'
-            intent['problem_diagnosis'] = True
-        
-        elif any(word in query_lower for word in ['best', 'strongest', 'performs best', 'top', 'leader']):
-            intent['type'] = 'best_performer'
-        
-        elif any(word in query_lower for word in ['factor', 'influence', 'affect', 'cause', 'impact']):
-            intent['type'] = 'factor_analysis'
-        
-        # Extract performance aspects
-        if 'tactical' in query_lower:
-            intent['performance_aspect'] = 'tactical'
-        elif 'positional' in query_lower:
-            intent['performance_aspect'] = 'positional'
-        elif 'endgame' in query_lower:
-            intent['performance_aspect'] = 'endgame'
-        elif 'opening' in query_lower:
-            intent['performance_aspect'] = 'opening'
-        elif any(word in query_lower for word in ['blitz', 'rapid', 'classical']):
-            for time_control in ['blitz', 'rapid', 'classical']:
-                if time_control in query_lower:
-                    intent['performance_aspect'] = time_control
-                    break
-        
-        # Extract time frame
-        if 'since' in query_lower:
-            version_match = re.search(r'since\s+(v?\d+\.?\d*)', query_lower)
-            if version_match:
-                intent['time_frame'] = {
-                    'type': 'since_version',
-                    'value': version_match.group(1)
-                }
-        elif 'last month' in query_lower:
-            intent['time_frame'] = {'type': 'duration', 'value': '1 month'}
-        elif 'last week' in query_lower:
-            intent['time_frame'] = {'type': 'duration', 'value': '1 week'}
-        
-        return intent
+        dependencies = RESPONSE_DEPENDENCIES.get(query_intent['type'], RESPONSE_DEPENDENCIES['general'])
+        loaders = {
+            'performance': self._load_performance,
+            'document_count': self._load_document_count,
+            'trend': self._load_trend,
+            'ratings': self._load_ratings,
+            'head_to_head': self._load_head_to_head
+        }
+        futures = {name: self._retrieval_pool.submit(loaders[name], query_intent, shared) for name in dependencies}
+        loaded = set()
+        for name, future in futures.items():
+            try:
+                data.update(future.result())
+                loaded.add(name)
+            except Exception as e:
+                print(f"Data retrieval error ({name}): {e}")
+        
+        # A best performer question whose time control slice is empty is answered from all games, ranked by rating
+        if (query_intent['type'] == 'best_performer' and query_intent.get('time_control')
+                and 'performance' in loaded and not data['time_control']):
+            try:
+                data['ratings'] = self._fetch(shared, ('ratings',), self.knowledge_base.get_engine_ratings)
+            except Exception as e:
+                print(f"Data retrieval error (ratings): {e}")
+        return data
     
-    def _retrieve_relevant_data(self, query_intent: Dict[str, Any]) -> Dict[str, Any]:
-        """Retrieve relevant data based on query intent"""
-        try:
-            # Get performance data
-            performance_data = self.knowledge_base.get_engine_performance_summary()
-            
-            # Get knowledge base documents
-            filters = {}
-            
-            # Filter by data type if specific analysis needed
-            if query_intent['type'] in ['trend_analysis', 'problem_diagnosis']:
-                # Prefer PGN data for performance analysis
-                filters['data_type'] = 'pgn_analysis'
-            
-            kb_data = self.knowledge_base.query_knowledge_base('analysis', filters)
-            
-            return {
-                'performance_summary': performance_data,
-                'knowledge_base': kb_data,
-                'relevant_engines': query_intent.get('engines', []),
-                'data_available': len(kb_data) > 0
-            }
-            
-        except Exception as e:
-            print(f"Data retrieval error: {e}")
-            return {
-                'performance_summary': {'engines': {}, 'total_games_analyzed': 0},
-                'knowledge_base': [],
-                'relevant_engines': [],
-                'data_available': False
-            }
+    def _load_performance(self, query_intent: Dict[str, Any], shared: Optional[Dict[Tuple, Any]]) -> Dict[str, Any]:
+        """Performance summary, from the precomputed time control slice when the query names one"""
+        kb = self.knowledge_base
+        time_control = query_intent.get('time_control')
+        if time_control:
+            performance_data = self._fetch(shared, ('performance', time_control),
+                                           lambda: kb.get_engine_performance_summary(time_control=time_control))
+            if performance_data.get('engines'):
+                return {'performance_summary': performance_data, 'time_control': time_control}
+        
+        performance_data = self._fetch(shared, ('performance', None), kb.get_engine_performance_summary)
+        return {'performance_summary': performance_data, 'time_control': None}
+    
+    def _load_document_count(self, query_intent: Dict[str, Any], shared: Optional[Dict[Tuple, Any]]) -> Dict[str, Any]:
+        """Number of knowledge base documents the response can cite, narrowed to the engines asked about"""
+        filters = {}
+        
+        # Filter by data type if specific analysis needed
+        if query_intent['type'] in ['trend_analysis', 'problem_diagnosis']:
+            # Prefer PGN data for performance analysis
+            filters['data_type'] = 'pgn_analysis'
+        
+        # Counted server-side from the engines recorded on each document at ingest
+        engines = query_intent.get('engines') or []
+        if engines:
+            filters['engine'] = engines
+        
+        count = self._fetch(shared, ('document_count', filters.get('data_type'), tuple(engines)),
+                            lambda: self.knowledge_base.count_documents(filters))
+        return {'document_count': count, 'data_available': count > 0}
+    
+    def _load_trend(self, query_intent: Dict[str, Any], shared: Optional[Dict[Tuple, Any]]) -> Dict[str, Any]:
+        """Bucketed history of each engine a trend question is about, over the time frame it asks for
+
+        Every version a family name resolved to gets its own series. "since
+        <version>" starts the series at that version's first dated game.
+        """
+        engines = (query_intent.get('engines') or ['V7P3R'])[:TREND_MAX_ENGINES]
+        time_frame = query_intent.get('time_frame') or {}
+        window_days = TREND_WINDOW_DAYS.get(time_frame.get('value'), TREND_WINDOW_DAYS['default'])
+        
+        since = None
+        if time_frame.get('type') == 'since_version':
+            since = self._version_start(query_intent.get('engines') or engines, time_frame['value'], shared)
+        date_from = since['date'] if since else None
+        
+        trends = {}
+        for engine in engines:
+            trends[engine] = self._fetch(
+                shared, ('trend', engine, window_days, date_from),
+                lambda engine=engine: self.knowledge_base.get_engine_trend(engine, window_days=window_days,
+                                                                           date_from=date_from))
+        return {'trend': trends, 'trend_since': since}
+    
+    def _version_start(self, engines: List[str], version: str,
+                       shared: Optional[Dict[Tuple, Any]]) -> Optional[Dict[str, Any]]:
+        """First dated game of the engine whose name carries the version, or None if none does"""
+        wanted = version.lower().lstrip('v')
+        for engine in engines:
+            if any(token.lstrip('v') == wanted for token in engine.lower().split()):
+                daily = self._fetch(shared, ('trend', engine, 'day'),
+                                    lambda: self.knowledge_base.get_engine_trend(engine, bucket='day'))
+                if daily.get('series'):
+                    return {'engine': engine, 'version': version, 'date': daily['series'][0]['period']}
+        return None
+    
+    def _load_ratings(self, query_intent: Dict[str, Any], shared: Optional[Dict[Tuple, Any]]) -> Dict[str, Any]:
+        """Strength estimates that account for who played whom; a time control slice ranks by its own results"""
+        if query_intent['type'] == 'best_performer' and query_intent.get('time_control'):
+            return {}
+        return {'ratings': self._fetch(shared, ('ratings',), self.knowledge_base.get_engine_ratings)}
+    
+    def _load_head_to_head(self, query_intent: Dict[str, Any], shared: Optional[Dict[Tuple, Any]]) -> Dict[str, Any]:
+        """Direct results between each pair of engines being compared"""
+        kb = self.knowledge_base
+        engines = query_intent.get('engines', [])[:HEAD_TO_HEAD_MAX_ENGINES]
+        return {'head_to_head': [
+            self._fetch(shared, ('head_to_head', engine, opponent),
+                        lambda engine=engine, opponent=opponent: kb.get_head_to_head(engine, opponent))
+            for engine, opponent in combinations(engines, 2)
+        ]}
+    
+    def _fetch(self, shared: Optional[Dict[Tuple, Any]], key: Tuple, loader):
+        """Load a piece of data, at most once per batch when a shared store is given"""
+        if shared is None:
+            return loader()
+        if key not in shared:
+            shared[key] = loader()
+        return shared[key]
     
     def _generate_response(self, query: str, query_intent: Dict[str, Any], relevant_data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate intelligent response based on query intent and data"""
@@ -167,6 +332,7 @@ class ChessEngineQueryProcessor:
             engines = ['V7P3R', 'SlowMate', 'C0BR4']
         
         performance_data = data['performance_summary'].get('engines', {})
+        ratings = (data.get('ratings') or {}).get('ratings', {})
         
         # Build comparison analysis
         comparison_text = f"Comparing {', '.join(engines)} performance:\n\n"
@@ -177,14 +343,44 @@ class ChessEngineQueryProcessor:
                 comparison_text += f"**{engine}**:\n"
                 comparison_text += f"• Win Rate: {stats.get('win_rate', 0)}%\n"
                 comparison_text += f"• Games Played: {stats.get('total', 0)}\n"
-                comparison_text += f"• Record: {stats.get('wins', 0)}W-{stats.get('draws', 0)}D-{stats.get('losses', 0)}L\n\n"
+                comparison_text += f"• Record: {stats.get('wins', 0)}W-{stats.get('draws', 0)}D-{stats.get('losses', 0)}L\n"
+                if engine in ratings:
+                    comparison_text += f"• Rating: {self._format_rating(ratings[engine])}\n"
+                comparison_text += "\n"
             else:
                 comparison_text += f"**{engine}**: No performance data available\n\n"
         
+        head_to_head = [record for record in data.get('head_to_head') or [] if record.get('games')]
+        if head_to_head:
+            comparison_text += "⚔️ **Head-to-Head**:\n"
+            for record in head_to_head:
+                comparison_text += (f"• {record['engine']} vs {record['opponent']}: "
+                                    f"+{record['wins']} ={record['draws']} -{record['losses']} "
+                                    f"({record['score']}% over {record['games']} games)\n")
+                for color in ('as_white', 'as_black'):
+                    split = record[color]
+                    if split['games']:
+                        comparison_text += (f"  ◦ {record['engine']} {color.replace('_', ' ')}: "
+                                            f"+{split['wins']} ={split['draws']} -{split['losses']} ({split['score']}%)\n")
+            comparison_text += "\n"
+        elif len(intent.get('engines') or []) > 1 and data['data_available']:
+            comparison_text += "⚔️ **Head-to-Head**: These engines have not played each other yet\n\n"
+        
         # Determine leader
         best_engine = self._find_best_performer(engines, performance_data)
-        
-        if best_engine:
+        rated = sorted((engine for engine in engines if engine in ratings),
+                       key=lambda engine: ratings[engine]['rating'], reverse=True)
+        
+        if len(rated) >= 2:
+            # Ratings weigh each result by the opponent's strength, so they decide the leader
+            leader, runner_up = ratings[rated[0]], ratings[rated[1]]
+            gap = leader['rating'] - runner_up['rating']
+            comparison_text += f"**Analysis**: {rated[0]} is rated highest, {gap:.0f} points above {rated[1]}"
+            if leader['ci_low'] > runner_up['ci_high']:
+                comparison_text += " (the 95% intervals do not overlap)."
+            else:
+                comparison_text += " (within the error bars, so more games are needed to separate them)."
+        elif best_engine:
             comparison_text += f"**Analysis**: {best_engine} currently leads with the highest win rate "
             comparison_text += f"({performance_data[best_engine]['win_rate']}%)."
         
@@ -193,6 +389,7 @@ class ChessEngineQueryProcessor:
             'confidence': 0.85 if data['data_available'] else 0.60,
             'sources': self._get_data_sources(data),
             'recommendations': [
+                f"Play more direct games between {' and '.join(engines)}" if head_to_head else
                 f"Analyze head-to-head results between {' and '.join(engines)}",
                 "Look at performance in specific time controls",
                 "Compare recent version improvements"
@@ -200,50 +397,73 @@ class ChessEngineQueryProcessor:
         }
     
     def _generate_trend_response(self, query: str, intent: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate trend analysis response"""
-        engine = intent.get('engines', ['V7P3R'])[0]
+        """Generate trend analysis response from each engine's bucketed game history"""
         performance_data = data['performance_summary'].get('engines', {})
+        trends = data.get('trend') or {}
+        engines = list(trends) or (intent.get('engines') or ['V7P3R'])[:TREND_MAX_ENGINES]
+        since = data.get('trend_since')
         
-        if engine in performance_data:
-            stats = performance_data[engine]
-            
-            # Simulate trend analysis (in production, this would use historical data)
-            trend_text = f"**{engine} Performance Analysis**:\n\n"
-            
-            if stats['win_rate'] > 60:
-                trend_text += "📈 **Strong Upward Trend**:\n"
-                trend_text += f"• Current win rate: {stats['win_rate']}%\n"
-                trend_text += "• Estimated +25-30 ELO improvement over recent versions\n"
-                trend_text += "• Tactical accuracy showing 10-15% improvement\n"
-                trend_text += "• Enhanced endgame evaluation leading to better conversion rates\n\n"
-                trend_text += "**Key Improvements**:\n"
-                trend_text += "• Better position evaluation in complex middlegames\n"
-                trend_text += "• Improved time management in critical positions\n"
-                trend_text += "• Enhanced opening preparation"
-            elif stats['win_rate'] > 45:
-                trend_text += "📊 **Steady Performance**:\n"
-                trend_text += f"• Current win rate: {stats['win_rate']}%\n"
-                trend_text += "• Performance remains consistent with minor fluctuations\n"
-                trend_text += "• Areas for potential improvement identified"
-            else:
-                trend_text += "📉 **Performance Concerns**:\n"
-                trend_text += f"• Current win rate: {stats['win_rate']}%\n"
-                trend_text += "• Recent decline suggests need for optimization\n"
-                trend_text += "• Recommend analyzing recent changes"
-        else:
-            trend_text = f"No performance data available for {engine}. Please upload game data for analysis."
+        sections = []
+        if since:
+            sections.append(f"Since {since['engine']} first played ({since['date']}):")
+        sections.extend(self._trend_text(engine, trends.get(engine) or {}, performance_data) for engine in engines)
+        has_series = any((trends.get(engine) or {}).get('series') for engine in engines)
         
         return {
-            'answer': trend_text,
-            'confidence': 0.80 if data['data_available'] else 0.50,
+            'answer': "\n\n".join(sections),
+            'confidence': 0.85 if has_series else (0.80 if data['data_available'] else 0.50),
             'sources': self._get_data_sources(data),
             'recommendations': [
-                f"Compare {engine} with previous versions",
+                f"Compare {engines[0]} with previous versions",
                 "Analyze specific areas of improvement",
                 "Upload more recent game data"
             ]
         }
     
+    def _trend_text(self, engine: str, trend: Dict[str, Any], performance_data: Dict[str, Any]) -> str:
+        """Trend report for one engine"""
+        series = trend.get('series', [])
+        
+        if series:
+            current = trend['current_window']
+            previous = trend['previous_window']
+            window_days = trend['window_days']
+            headings = {
+                'improving': "📈 **Upward Trend**",
+                'declining': "📉 **Downward Trend**",
+                'steady': "📊 **Steady Performance**",
+                'insufficient_data': "📊 **Not Enough History Yet**"
+            }
+            
+            trend_text = f"**{engine} Performance Trend**:\n\n"
+            trend_text += f"{headings[trend['direction']]}:\n"
+            trend_text += (f"• Last {window_days} days ({current['start']} to {current['end']}): "
+                           f"{current['win_rate']}% win rate over {current['total']} games\n")
+            if previous['total']:
+                trend_text += (f"• Previous {window_days} days: {previous['win_rate']}% win rate "
+                               f"over {previous['total']} games\n")
+                trend_text += f"• Change: {trend['win_rate_delta']:+.2f} percentage points\n"
+            else:
+                trend_text += f"• No games in the {window_days} days before that to compare against\n"
+            
+            unit = 'week' if trend['bucket'] == 'week' else 'day'
+            trend_text += (f"• Rolling {trend['rolling']}-{unit} win rate: {series[0]['rolling_win_rate']}% "
+                           f"({series[0]['period']}) → {series[-1]['rolling_win_rate']}% ({series[-1]['period']})")
+            
+            if len(series) > 1:
+                best = max(series, key=lambda point: point['win_rate'])
+                worst = min(series, key=lambda point: point['win_rate'])
+                trend_text += f"\n• Best {unit}: {best['period']} ({best['win_rate']}% over {best['total']} games)"
+                trend_text += f"\n• Weakest {unit}: {worst['period']} ({worst['win_rate']}% over {worst['total']} games)"
+        elif engine in performance_data:
+            stats = performance_data[engine]
+            trend_text = f"**{engine} Performance Analysis**:\n\n"
+            trend_text += f"• Current win rate: {stats['win_rate']}% over {stats['total']} games\n"
+            trend_text += "• None of these games carry a date, so no trend over time can be measured yet"
+        else:
+            trend_text = f"No performance data available for {engine}. Please upload game data for analysis."
+        return trend_text
+    
     def _generate_diagnosis_response(self, query: str, intent: Dict[str, Any], data: Dict[str, Any]) -> Dict[str, Any]:
         """Generate problem diagnosis response"""
         engine = intent.get('engines', ['V7P3R'])[0] if intent.get('engines') else 'the engine'
@@ -286,18 +506,40 @@ class ChessEngineQueryProcessor:
                 'recommendations': ["Upload PGN files with game results"]
             }
         
-        # Find best performer
-        best_engine = max(performance_data.keys(), 
-                         key=lambda x: performance_data[x].get('win_rate', 0))
+        # Find best performer: highest rating when ratings exist, else highest win rate.
+        # Ratings span every time control, so a time control slice is ranked by its own win rates.
+        time_control = data.get('time_control')
+        ratings = {
+            engine: rating for engine, rating in ((data.get('ratings') or {}).get('ratings') or {}).items()
+            if engine in performance_data and not time_control
+        }
+        if ratings:
+            best_engine = max(ratings, key=lambda x: ratings[x]['rating'])
+        else:
+            best_engine = max(performance_data.keys(), 
+                             key=lambda x: performance_data[x].get('win_rate', 0))
         
         best_stats = performance_data[best_engine]
         
         response_text = f"**Best Performer in {aspect.title()} Play**: **{best_engine}**\n\n"
+        if time_control:
+            response_text += (f"⏱️ Based on {data['performance_summary'].get('total_games_analyzed', 0)} "
+                              f"{time_control} games\n\n")
+        elif intent.get('time_control'):
+            response_text += f"⏱️ No {intent['time_control']} games recorded yet, so all time controls are ranked\n\n"
         response_text += f"📊 **Performance Metrics**:\n"
+        if best_engine in ratings:
+            response_text += f"• Rating: {self._format_rating(ratings[best_engine])}\n"
         response_text += f"• Win Rate: {best_stats['win_rate']}%\n"
         response_text += f"• Total Games: {best_stats['total']}\n"
         response_text += f"• Record: {best_stats['wins']}W-{best_stats['draws']}D-{best_stats['losses']}L\n\n"
         
+        if len(ratings) > 1:
+            response_text += "🏆 **Rating Leaderboard**:\n"
+            for rank, engine in enumerate(sorted(ratings, key=lambda x: ratings[x]['rating'], reverse=True)[:5], 1):
+                response_text += f"{rank}. {engine}: {self._format_rating(ratings[engine])}\n"
+            response_text += "\n"
+        
         if aspect == 'blitz':
             response_text += "**Blitz Strengths**:\n"
             response_text += "• Quick tactical calculation\n"
@@ -438,6 +680,11 @@ class ChessEngineQueryProcessor:
         
         return best_engine
     
+    def _format_rating(self, rating: Dict[str, Any]) -> str:
+        """Rating with its error bar and 95% interval for display"""
+        return (f"{rating['rating']:.0f} ± {rating['error']:.0f} "
+                f"(95% CI {rating['ci_low']:.0f}–{rating['ci_high']:.0f}, {rating['games']} rated games)")
+    
     def _get_data_sources(self, data: Dict[str, Any]) -> List[str]:
         """Get list of data sources for the response"""
         sources = []
@@ -449,9 +696,9 @@ class ChessEngineQueryProcessor:
                 "Historical performance metrics"
             ])
         
-        kb_data = data.get('knowledge_base', [])
-        if kb_data:
-            sources.append(f"Analysis from {len(kb_data)} uploaded documents")
+        document_count = data.get('document_count', 0)
+        if document_count:
+            sources.append(f"Analysis from {document_count} uploaded documents")
         
         if not sources:
             sources = ["General chess engine knowledge"]
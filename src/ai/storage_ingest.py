@@ -0,0 +1,398 @@
+"""
+Chess Engine Metrics AI - Storage Ingest Pipeline
+Concurrent download, parse and batched write stages for bulk storage ingestion
+"""
+
+import io
+import os
+import queue
+import hashlib
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Any, Tuple, Iterator
+from game_store import GameBatchWriter, delete_document_games, FIRESTORE_MAX_BATCH_WRITES
+from parallel_ingest import PGN_SHARD_BYTES
+
+# Concurrent blob downloads (I/O bound, so well above the core count)
+INGEST_DOWNLOAD_WORKERS = int(os.getenv('INGEST_DOWNLOAD_WORKERS', 16))
+
+# Threads turning downloaded content into knowledge base documents
+INGEST_PARSE_WORKERS = int(os.getenv('INGEST_PARSE_WORKERS', 2))
+
+# Writes per Firestore batch when committing documents, capped at Firestore's limit
+INGEST_BATCH_WRITES = min(int(os.getenv('INGEST_BATCH_WRITES', FIRESTORE_MAX_BATCH_WRITES)),
+                          FIRESTORE_MAX_BATCH_WRITES)
+
+# Writes staged once per batch: the performance and time control aggregates and the data version
+AGGREGATE_BATCH_WRITES = 3
+
+# Files allowed between listing and the write queue before listing pauses
+INGEST_MAX_IN_FLIGHT = int(os.getenv('INGEST_MAX_IN_FLIGHT', 64))
+
+# PGN blobs larger than this are parsed from a chunked stream instead of downloaded whole
+PGN_STREAM_THRESHOLD = int(os.getenv('PGN_STREAM_THRESHOLD', 16 * 1024 * 1024))
+
+# Bytes fetched per ranged request when streaming blobs from storage
+STORAGE_CHUNK_SIZE = int(os.getenv('STORAGE_CHUNK_SIZE', 8 * 1024 * 1024))
+
+SUPPORTED_EXTENSIONS = ['pgn', 'json', 'md']
+
+MANIFEST_COLLECTION = 'ingest_manifest'
+
+_DONE = object()
+
+
+class StorageIngestPipeline:
+    """Ingests every supported blob under a prefix through bounded concurrent stages
+
+    Listing feeds a download pool, downloads feed a parse pool and parsed
+    documents go through a bounded queue to a single writer that commits them
+    in batches sized by their write count. A full write queue blocks the parsers, which stalls the
+    downloads, and listing stops once max_in_flight files are in progress.
+
+    An ingest manifest records each blob's generation, MD5 and ETag along with
+    the document it produced. Blobs whose listing metadata still matches are
+    skipped before download, and changed blobs overwrite their previous
+    document instead of adding a duplicate.
+    """
+    
+    def __init__(self, knowledge_base, download_workers: Optional[int] = None,
+                 parse_workers: Optional[int] = None, batch_writes: Optional[int] = None,
+                 max_in_flight: Optional[int] = None, progress=None):
+        self.knowledge_base = knowledge_base
+        self.progress = progress
+        self.download_workers = download_workers or INGEST_DOWNLOAD_WORKERS
+        self.parse_workers = parse_workers or INGEST_PARSE_WORKERS
+        self.batch_writes = min(batch_writes or INGEST_BATCH_WRITES, FIRESTORE_MAX_BATCH_WRITES)
+        self.max_in_flight = max_in_flight or INGEST_MAX_IN_FLIGHT
+        
+        self._outcomes: Dict[int, Tuple[bool, str]] = {}
+        self._outcomes_lock = threading.Lock()
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+    
+    def run(self, prefix: str = "", force: bool = False) -> Dict[str, Any]:
+        """Ingest new or changed files under prefix and report per-file results
+
+        With force=True every supported file is re-ingested regardless of the manifest.
+        """
+        results = {
+            'processed': 0,
+            'errors': 0,
+            'skipped': 0,
+            'details': []
+        }
+        
+        bucket = self.knowledge_base.bucket
+        if not bucket:
+            return results
+        
+        self._outcomes = {}
+        manifest = self._load_manifest(prefix)
+        in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        write_queue = queue.Queue(maxsize=self.max_in_flight)
+        writer = threading.Thread(target=self._write_stage, args=(write_queue,), daemon=True)
+        writer.start()
+        
+        file_count = 0
+        try:
+            # Parsers are shut down after downloads, which submit into them
+            with ThreadPoolExecutor(self.parse_workers) as parsers, \
+                    ThreadPoolExecutor(self.download_workers) as downloads:
+                for blob in bucket.list_blobs(prefix=prefix):
+                    # Skip directories and unsupported files
+                    if blob.name.endswith('/'):
+                        continue
+                    
+                    file_ext = blob.name.lower().split('.')[-1]
+                    if file_ext not in SUPPORTED_EXTENSIONS:
+                        results['skipped'] += 1
+                        self._count('files_skipped')
+                        continue
+                    
+                    entry = manifest.get(blob.name)
+                    if not force and entry and entry.get('fingerprint') == blob_fingerprint(blob):
+                        results['skipped'] += 1
+                        results['details'].append(f"Unchanged: {blob.name}")
+                        self._count('files_skipped')
+                        continue
+                    
+                    if not self.knowledge_base.db:
+                        self._record(file_count, False,
+                                     f"Error processing {blob.name}: Database connection not available")
+                        file_count += 1
+                        continue
+                    
+                    in_flight.acquire()
+                    self._count('files_queued')
+                    downloads.submit(self._download_stage, file_count, blob, file_ext,
+                                     parsers, write_queue, in_flight)
+                    file_count += 1
+        finally:
+            write_queue.put(_DONE)
+            writer.join()
+        
+        print(f"📁 Ingested {file_count} files with prefix '{prefix}'")
+        
+        # Unchanged files are reported ahead of the files this run touched
+        for index in range(file_count):
+            success, detail = self._outcomes.get(index, (False, "Error processing file: no result"))
+            results['processed' if success else 'errors'] += 1
+            results['details'].append(detail)
+        
+        return results
+    
+    def _load_manifest(self, prefix: str) -> Dict[str, Dict[str, Any]]:
+        """Load manifest entries for every blob under prefix, keyed by blob name"""
+        db = self.knowledge_base.db
+        if not db:
+            return {}
+        
+        query = db.collection(MANIFEST_COLLECTION)
+        if prefix:
+            query = query.where('blob_name', '>=', prefix).where('blob_name', '<', prefix + '\uf8ff')
+        
+        manifest = {}
+        for doc in query.stream():
+            entry = doc.to_dict()
+            manifest[entry.get('blob_name')] = entry
+        
+        self._manifest = manifest
+        return manifest
+    
+    def _previous_document_id(self, blob) -> Optional[str]:
+        """Return the knowledge base document a blob produced on an earlier run"""
+        entry = self._manifest.get(blob.name)
+        return entry.get('document_id') if entry else None
+    
+    def _record(self, index: int, success: bool, detail: str) -> None:
+        """Record the outcome for one file"""
+        with self._outcomes_lock:
+            self._outcomes[index] = (success, detail)
+        self._count('files_done' if success else 'files_failed')
+    
+    def _count(self, counter: str, amount: int = 1) -> None:
+        """Add to a counter on the job progress object, if there is one"""
+        if self.progress is not None:
+            self.progress.increment(counter, amount)
+    
+    def _download_stage(self, index: int, blob, file_ext: str, parsers: ThreadPoolExecutor,
+                        write_queue: queue.Queue, in_flight: threading.BoundedSemaphore) -> None:
+        """Fetch one blob and hand it to the parse stage"""
+        try:
+            if file_ext == 'pgn' and (blob.size or 0) > PGN_STREAM_THRESHOLD:
+                source = blob.open('r', encoding='utf-8', chunk_size=STORAGE_CHUNK_SIZE)
+            else:
+                source = blob.download_as_text()
+        except Exception as e:
+            self._record(index, False, f"Failed to load: {blob.name} ({e})")
+            in_flight.release()
+            return
+        
+        parsers.submit(self._parse_stage, index, blob, file_ext, source, write_queue, in_flight)
+    
+    def _parse_stage(self, index: int, blob, file_ext: str, source: Any,
+                     write_queue: queue.Queue, in_flight: threading.BoundedSemaphore) -> None:
+        """Turn downloaded content into a knowledge base document and queue it for writing"""
+        try:
+            if not source:
+                self._record(index, False, f"Failed to load: {blob.name}")
+                return
+            
+            # Fix the document ID up front so PGN games can reference it as they stream out
+            document_id = self.knowledge_base.db.collection('knowledge_base').document(
+                self._previous_document_id(blob)).id
+            document = self._prepare_document(blob, file_ext, source, document_id)
+            write_queue.put((index, blob, document_id, document))
+        
+        except Exception as e:
+            self._record(index, False, f"Error processing {blob.name}: {e}")
+        finally:
+            if hasattr(source, 'close'):
+                source.close()
+            in_flight.release()
+    
+    def _prepare_document(self, blob, file_ext: str, source: Any, document_id: str) -> Dict[str, Any]:
+        """Build the knowledge base document for a blob's content"""
+        metadata = {'fileName': blob.name.split('/')[-1]}
+        
+        if file_ext == 'pgn':
+            pgn_io = io.StringIO(source) if isinstance(source, str) else source
+            game_writer = GameBatchWriter(self.knowledge_base.db, document_id, metadata['fileName'],
+                                          progress=self.progress)
+            # Files below one shard would only pay the process pool's startup cost
+            workers = 1 if (blob.size or 0) < PGN_SHARD_BYTES else None
+            try:
+                document = self.knowledge_base.prepare_pgn_document(pgn_io, metadata, workers=workers,
+                                                                    game_sink=game_writer.add)
+                game_writer.close()
+            except Exception:
+                # Only this attempt's generation goes; a replaced document keeps the games it points at
+                game_writer.discard()
+                raise
+            document['games_generation'] = game_writer.generation
+            return document
+        elif file_ext == 'json':
+            return self.knowledge_base.prepare_json_document(source, metadata)
+        return self.knowledge_base.prepare_markdown_document(source, metadata)
+    
+    def _write_stage(self, write_queue: queue.Queue) -> None:
+        """Commit queued documents in batches until the pipeline finishes
+
+        A batch is committed once the next document would take its writes
+        past batch_writes. A document over batch_writes on its own is
+        committed alone, with its aggregate rows split across batches.
+        """
+        pending = []
+        budget = WriteBudget()
+        while True:
+            item = write_queue.get()
+            if item is _DONE:
+                break
+            
+            if pending and budget.writes_with([item[3]]) > self.batch_writes:
+                self._commit(pending)
+                pending = []
+                budget = WriteBudget()
+            pending.append(item)
+            budget.add([item[3]])
+        
+        if pending:
+            self._commit(pending)
+    
+    def _commit(self, items: List[Tuple[int, Any, str, Dict[str, Any]]]) -> None:
+        """Write queued documents and record each file's outcome
+
+        Documents being overwritten have their totals backed out of the
+        aggregates, which adds their trend and head-to-head rows to the
+        writes, so the items are split again once those are known.
+        """
+        try:
+            if not self.knowledge_base.db:
+                raise RuntimeError('Database connection not available')
+            replaced = self.knowledge_base.load_aggregate_sources(
+                [self._previous_document_id(blob) for _, blob, _, _ in items if self._previous_document_id(blob)])
+        except Exception as e:
+            self._fail(items, e)
+            return
+        
+        for batch_items in self._split_batches(items, replaced):
+            self._commit_batch(batch_items, [replaced[self._previous_document_id(blob)]
+                                             for _, blob, _, _ in batch_items
+                                             if self._previous_document_id(blob) in replaced])
+    
+    def _split_batches(self, items: List[Tuple[int, Any, str, Dict[str, Any]]],
+                       replaced: Dict[str, Dict[str, Any]]) -> Iterator[List[Tuple[int, Any, str, Dict[str, Any]]]]:
+        """Group items into runs whose writes, replaced documents included, fit in batch_writes
+
+        An item over batch_writes on its own forms a run by itself.
+        """
+        pending = []
+        budget = WriteBudget()
+        for item in items:
+            previous = replaced.get(self._previous_document_id(item[1]))
+            documents = [item[3]] + ([previous] if previous else [])
+            if pending and budget.writes_with(documents) > self.batch_writes:
+                yield pending
+                pending = []
+                budget = WriteBudget()
+            pending.append(item)
+            budget.add(documents)
+        if pending:
+            yield pending
+    
+    def _commit_batch(self, items: List[Tuple[int, Any, str, Dict[str, Any]]],
+                      replaced: List[Dict[str, Any]]) -> None:
+        """Write one batch of documents with their aggregate updates and record each file's outcome"""
+        try:
+            db = self.knowledge_base.db
+            writes = []
+            for _, blob, document_id, document in items:
+                writes.append((db.collection('knowledge_base').document(document_id),
+                               self.knowledge_base.stored_document(document)))
+                writes.append((db.collection(MANIFEST_COLLECTION).document(manifest_id(blob.name)), {
+                    'blob_name': blob.name,
+                    'fingerprint': blob_fingerprint(blob),
+                    'size': blob.size,
+                    'document_id': document_id,
+                    'data_type': document.get('data_type'),
+                    'ingested_at': datetime.utcnow().isoformat()
+                }))
+            self.knowledge_base.commit_with_aggregates(writes, [document for _, _, _, document in items],
+                                                       replaced, self.batch_writes)
+        
+        except Exception as e:
+            self._fail(items, e)
+            return
+        
+        for index, blob, document_id, document in items:
+            # The replaced version's games are no longer pointed at by the document
+            if document.get('data_type') == 'pgn_analysis' and self._previous_document_id(blob):
+                self._delete_games(document_id, keep_generation=document['games_generation'])
+            self._record(index, True, f"Processed: {blob.name}")
+    
+    def _fail(self, items: List[Tuple[int, Any, str, Dict[str, Any]]], error: Exception) -> None:
+        """Record the files of an uncommitted batch as failed"""
+        for index, blob, document_id, document in items:
+            # The new generation was never pointed at; a replaced document keeps its previous games
+            if document.get('data_type') == 'pgn_analysis':
+                self._delete_games(document_id, generation=document['games_generation'])
+            self._record(index, False, f"Error processing {blob.name}: {error}")
+    
+    def _delete_games(self, document_id: str, generation: Optional[str] = None,
+                      keep_generation: Optional[str] = None) -> None:
+        """Delete a document's games of one generation or all but one, logging rather than raising on failure"""
+        try:
+            delete_document_games(self.knowledge_base.db, document_id, generation, keep_generation)
+        except Exception as e:
+            print(f"❌ Failed to remove games of document {document_id}: {e}")
+
+
+class WriteBudget:
+    """Running count of the writes a batch of documents stages
+
+    Each file writes its document and manifest entry; its aggregate updates
+    add one trend row per engine with dated games and one head-to-head row
+    per engine it paired, shared with the other documents in the batch, plus
+    AGGREGATE_BATCH_WRITES per batch.
+    """
+    
+    def __init__(self):
+        self.files = 0
+        self.trend_rows = set()
+        self.head_to_head_rows = set()
+    
+    def writes_with(self, documents: List[Dict[str, Any]]) -> int:
+        """Writes of the batch if one more file, with its new and replaced documents, joined it"""
+        trend_rows, head_to_head_rows = set(self.trend_rows), set(self.head_to_head_rows)
+        for document in documents:
+            _add_aggregate_rows(document, trend_rows, head_to_head_rows)
+        return 2 * (self.files + 1) + len(trend_rows) + len(head_to_head_rows) + AGGREGATE_BATCH_WRITES
+    
+    def add(self, documents: List[Dict[str, Any]]) -> None:
+        """Count one file, given its new document and the one it replaces, if any"""
+        self.files += 1
+        for document in documents:
+            _add_aggregate_rows(document, self.trend_rows, self.head_to_head_rows)
+
+
+def _add_aggregate_rows(document: Dict[str, Any], trend_rows: set, head_to_head_rows: set) -> None:
+    """Add the engines whose trend and head-to-head rows a document's aggregate updates touch"""
+    trend_rows.update(document.get('engine_daily') or {})
+    for engine, opponents in (document.get('head_to_head') or {}).items():
+        head_to_head_rows.add(engine)
+        head_to_head_rows.update(opponents)
+
+
+def manifest_id(blob_name: str) -> str:
+    """Firestore-safe manifest document ID for a blob name"""
+    return hashlib.sha1(blob_name.encode('utf-8')).hexdigest()
+
+
+def blob_fingerprint(blob) -> Dict[str, Any]:
+    """Identify a blob's content from its listing metadata"""
+    return {
+        'generation': str(blob.generation) if blob.generation is not None else None,
+        'md5_hash': blob.md5_hash,
+        'etag': blob.etag
+    }
@@ -45,7 +45,20 @@ def test_auto_ingest():
         print(f"Status: {response.status_code}")
         data = response.json()
         if data.get('success'):
-            result = data.get('result', {})
+            # Ingestion runs as a background job; poll it until it finishes
+            job = {'status': data.get('status')}
+            while job.get('status') in ('queued', 'running'):
+                time.sleep(1)
+                job = requests.get(f"{BASE_URL}{data['status_url']}").json().get('job', {})
+                progress = job.get('progress', {})
+                print(f"   {job.get('status')}: {progress.get('files_done', 0)} files, "
+                      f"{progress.get('games', 0)} games")
+            
+            if job.get('status') != 'completed':
+                print(f"❌ Auto-ingest job {job.get('status')}: {job.get('error')}")
+                return False
+            
+            result = job.get('result') or {}
             print(f"Processed: {result.get('processed', 0)} files")
             print(f"Errors: {result.get('errors', 0)} files")
             print(f"Skipped: {result.get('skipped', 0)} files")
@@ -56,7 +69,7 @@ def test_auto_ingest():
         else:
             print(f"❌ Auto-ingest failed: {data.get('error')}")
         
-        return response.status_code == 200
+        return response.status_code in (200, 202)
     except Exception as e:
         print(f"❌ Auto-ingest failed: {e}")
         return False
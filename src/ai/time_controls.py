@@ -0,0 +1,125 @@
+"""
+Chess Engine Metrics AI - Time Controls
+PGN TimeControl parsing into categories, with per-engine per-category results
+"""
+
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Iterable, NamedTuple
+from google.cloud import firestore
+
+# Categories in order of increasing game length, then games without a usable time control
+TIME_CONTROL_CATEGORIES = ['bullet', 'blitz', 'rapid', 'classical', 'untimed', 'unknown']
+
+# Upper bounds (exclusive) on estimated game seconds, base + 40 * increment
+CATEGORY_LIMITS = [('bullet', 180), ('blitz', 480), ('rapid', 1500)]
+
+# Order of the counts in a document's per-category contribution lists
+RESULT_KEYS = ['wins', 'draws', 'losses', 'total']
+
+# One period of a PGN TimeControl: "300+3", "40/7200", "*60" or "3600"
+PERIOD_PATTERN = re.compile(r'^(?:(\d+)/)?(\*)?(\d+(?:\.\d+)?)(?:\+(\d+(?:\.\d+)?))?$')
+
+TimeControlCounts = Dict[str, Dict[str, List[int]]]
+
+
+class TimeControl(NamedTuple):
+    category: str
+    base_seconds: Optional[float] = None
+    increment_seconds: Optional[float] = None
+    moves: Optional[int] = None
+
+
+@lru_cache(maxsize=1024)
+def parse_time_control(raw: Optional[str]) -> TimeControl:
+    """Parse a PGN TimeControl tag (first period) into its category, base, increment and move count
+
+    "-" means no time control; "?", empty or malformed tags are unknown.
+    """
+    text = (raw or '').strip()
+    if text == '-':
+        return TimeControl('untimed')
+    
+    period = PERIOD_PATTERN.match(text.split(':')[0])
+    if not period:
+        return TimeControl('unknown')
+    
+    moves = int(period.group(1)) if period.group(1) else None
+    base = float(period.group(3))
+    increment = float(period.group(4)) if period.group(4) else 0.0
+    
+    # Moves-per-period controls ("40/7200") give their whole budget for the first 40 moves
+    estimated = base + 40 * increment
+    category = 'classical'
+    for name, limit in CATEGORY_LIMITS:
+        if estimated < limit:
+            category = name
+            break
+    
+    return TimeControl(category, base, increment, moves)
+
+
+def time_control_category(value: Optional[str]) -> str:
+    """Validate a category name given by a caller, raising ValueError for unknown ones"""
+    category = (value or '').strip().lower()
+    if category not in TIME_CONTROL_CATEGORIES:
+        raise ValueError(f"Unknown time control: {value}. Supported: {', '.join(TIME_CONTROL_CATEGORIES)}")
+    return category
+
+
+def fold_time_control_stats(time_control_stats: TimeControlCounts, game: Dict[str, Any]) -> None:
+    """Fold a single game into per-engine, per-category [wins, draws, losses, total] counts"""
+    category = game.get('time_control_category') or parse_time_control(game.get('time_control')).category
+    result = game['result']
+    for engine, won, lost in ((game['white'], result == '1-0', result == '0-1'),
+                              (game['black'], result == '0-1', result == '1-0')):
+        counts = time_control_stats.setdefault(engine, {}).setdefault(category, [0, 0, 0, 0])
+        counts[0] += won
+        counts[1] += result == '1/2-1/2'
+        counts[2] += lost
+        counts[3] += 1
+
+
+def merge_time_control_stats(time_control_stats: TimeControlCounts, shard_stats: TimeControlCounts) -> None:
+    """Merge shard per-category counts into running totals"""
+    for engine, categories in shard_stats.items():
+        engine_categories = time_control_stats.setdefault(engine, {})
+        for category, counts in categories.items():
+            totals = engine_categories.setdefault(category, [0, 0, 0, 0])
+            for index, value in enumerate(counts):
+                totals[index] += value
+
+
+def time_control_update(added: Iterable[Dict[str, Any]],
+                        replaced: Optional[Iterable[Dict[str, Any]]] = None) -> Optional[Dict[str, Any]]:
+    """Build the merge update that moves the per-category aggregate by the given documents
+
+    Documents in replaced are subtracted, as for the performance aggregate.
+    Returns None when nothing changes.
+    """
+    delta: TimeControlCounts = {}
+    for sign, documents in ((1, added), (-1, replaced or [])):
+        for document in documents:
+            for engine, categories in (document.get('time_control_performance') or {}).items():
+                engine_delta = delta.setdefault(engine, {})
+                for category, counts in categories.items():
+                    totals = engine_delta.setdefault(category, [0, 0, 0, 0])
+                    for index, value in enumerate(counts):
+                        totals[index] += sign * value
+    
+    engines = {
+        engine: {
+            category: {key: firestore.Increment(value) for key, value in zip(RESULT_KEYS, counts)}
+            for category, counts in categories.items() if any(counts)
+        }
+        for engine, categories in delta.items()
+    }
+    engines = {engine: categories for engine, categories in engines.items() if categories}
+    if not engines:
+        return None
+    
+    return {
+        'engines': engines,
+        'updated_at': datetime.utcnow().isoformat()
+    }
@@ -0,0 +1,192 @@
+"""
+Chess Engine Metrics AI - Trend Engine
+Per-engine daily and weekly result buckets maintained at ingest, with rolling rates
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Any, Iterable
+from google.cloud import firestore
+from game_store import normalize_pgn_date
+
+TRENDS_COLLECTION = 'engine_trends'
+
+# Order of the counts in a document's engine_daily contribution lists
+BUCKET_KEYS = ['wins', 'draws', 'losses', 'total']
+
+# Win rate change (percentage points) between windows reported as a trend
+TREND_THRESHOLD = 2.0
+
+DailyCounts = Dict[str, Dict[str, List[int]]]
+
+
+def week_start(iso_date: str) -> str:
+    """Monday of the ISO week containing a YYYY-MM-DD date"""
+    day = date.fromisoformat(iso_date)
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+def fold_engine_daily(engine_daily: DailyCounts, game: Dict[str, Any]) -> None:
+    """Fold a single dated game into per-engine, per-day [wins, draws, losses, total] counts"""
+    game_date = game.get('game_date') or normalize_pgn_date(game.get('date'))
+    if not game_date:
+        return
+    try:
+        date.fromisoformat(game_date)
+    except ValueError:
+        return
+    
+    result = game['result']
+    for engine, won, lost in ((game['white'], result == '1-0', result == '0-1'),
+                              (game['black'], result == '0-1', result == '1-0')):
+        counts = engine_daily.setdefault(engine, {}).setdefault(game_date, [0, 0, 0, 0])
+        counts[0] += won
+        counts[1] += result == '1/2-1/2'
+        counts[2] += lost
+        counts[3] += 1
+
+
+def merge_engine_daily(engine_daily: DailyCounts, shard_daily: DailyCounts) -> None:
+    """Merge shard daily counts into running totals"""
+    for engine, days in shard_daily.items():
+        engine_days = engine_daily.setdefault(engine, {})
+        for game_date, counts in days.items():
+            totals = engine_days.setdefault(game_date, [0, 0, 0, 0])
+            for index, value in enumerate(counts):
+                totals[index] += value
+
+
+def trend_updates(added: Iterable[Dict[str, Any]],
+                  replaced: Optional[Iterable[Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Build per-engine merge updates moving the daily and weekly buckets by the given documents
+
+    Documents in replaced are subtracted, as for the performance aggregate.
+    """
+    delta: DailyCounts = {}
+    for sign, documents in ((1, added), (-1, replaced or [])):
+        for document in documents:
+            for engine, days in (document.get('engine_daily') or {}).items():
+                engine_delta = delta.setdefault(engine, {})
+                for game_date, counts in days.items():
+                    totals = engine_delta.setdefault(game_date, [0, 0, 0, 0])
+                    for index, value in enumerate(counts):
+                        totals[index] += sign * value
+    
+    updates = {}
+    for engine, days in delta.items():
+        daily = {}
+        weekly: DailyCounts = {}
+        for game_date, counts in days.items():
+            if not any(counts):
+                continue
+            daily[game_date] = counts
+            week_totals = weekly.setdefault(week_start(game_date), [0, 0, 0, 0])
+            for index, value in enumerate(counts):
+                week_totals[index] += value
+        
+        if daily:
+            updates[engine] = {
+                'engine': engine,
+                'daily': {day: _increments(counts) for day, counts in daily.items()},
+                'weekly': {week: _increments(counts) for week, counts in weekly.items()},
+                'updated_at': datetime.utcnow().isoformat()
+            }
+    return updates
+
+
+def build_trend(trend_documents: Iterable[Dict[str, Any]], bucket: str = 'week',
+                window_days: int = 28, rolling: int = 4, date_from: Optional[str] = None,
+                date_to: Optional[str] = None) -> Dict[str, Any]:
+    """Series of bucketed results with rolling win rates, plus the change between the last two windows
+
+    Buckets from several trend documents (e.g. every version of an engine)
+    are summed. The latest window ends at the newest bucket; the previous
+    window is the same number of days before it.
+    """
+    if bucket not in ('day', 'week'):
+        raise ValueError(f"Unknown trend bucket: {bucket}. Supported: day, week")
+    field = 'daily' if bucket == 'day' else 'weekly'
+    
+    buckets: Dict[str, List[int]] = {}
+    daily: Dict[str, List[int]] = {}
+    for document in trend_documents:
+        for source, target in ((document.get(field) or {}, buckets), (document.get('daily') or {}, daily)):
+            for period, counts in source.items():
+                totals = target.setdefault(period, [0, 0, 0, 0])
+                for index, key in enumerate(BUCKET_KEYS):
+                    totals[index] += counts.get(key, 0)
+    
+    periods = sorted(period for period, counts in buckets.items() if counts[3] > 0
+                     and (not date_from or period >= date_from) and (not date_to or period <= date_to))
+    
+    series = []
+    window: List[List[int]] = []
+    for period in periods:
+        counts = buckets[period]
+        window.append(counts)
+        if len(window) > rolling:
+            window.pop(0)
+        rolling_wins = sum(entry[0] for entry in window)
+        rolling_total = sum(entry[3] for entry in window)
+        
+        point = {'period': period}
+        point.update(dict(zip(BUCKET_KEYS, counts)))
+        point['win_rate'] = _rate(counts[0], counts[3])
+        point['rolling_win_rate'] = _rate(rolling_wins, rolling_total)
+        series.append(point)
+    
+    result = {
+        'bucket': bucket,
+        'rolling': rolling,
+        'window_days': window_days,
+        'series': series,
+        'current_window': None,
+        'previous_window': None,
+        'win_rate_delta': None,
+        'direction': 'insufficient_data'
+    }
+    
+    days = sorted(day for day, counts in daily.items() if counts[3] > 0
+                  and (not date_from or day >= date_from) and (not date_to or day <= date_to))
+    if days:
+        end = date.fromisoformat(days[-1])
+        current_start = end - timedelta(days=window_days - 1)
+        previous_start = current_start - timedelta(days=window_days)
+        result['current_window'] = _window(daily, days, current_start, end)
+        result['previous_window'] = _window(daily, days, previous_start, current_start - timedelta(days=1))
+        
+        if result['current_window']['total'] and result['previous_window']['total']:
+            delta = round(result['current_window']['win_rate'] - result['previous_window']['win_rate'], 2)
+            result['win_rate_delta'] = delta
+            if delta > TREND_THRESHOLD:
+                result['direction'] = 'improving'
+            elif delta < -TREND_THRESHOLD:
+                result['direction'] = 'declining'
+            else:
+                result['direction'] = 'steady'
+    
+    return result
+
+
+def _window(daily: Dict[str, List[int]], days: List[str], start: date, end: date) -> Dict[str, Any]:
+    """Summed counts and win rate for the days between start and end inclusive"""
+    start_key, end_key = start.isoformat(), end.isoformat()
+    totals = [0, 0, 0, 0]
+    for day in days:
+        if start_key <= day <= end_key:
+            for index, value in enumerate(daily[day]):
+                totals[index] += value
+    
+    window = {'start': start_key, 'end': end_key}
+    window.update(dict(zip(BUCKET_KEYS, totals)))
+    window['win_rate'] = _rate(totals[0], totals[3])
+    return window
+
+
+def _increments(counts: List[int]) -> Dict[str, Any]:
+    """Increment transforms for one bucket's counts"""
+    return {key: firestore.Increment(value) for key, value in zip(BUCKET_KEYS, counts)}
+
+
+def _rate(part: int, total: int) -> float:
+    """Percentage rounded to two places, 0 when there is nothing to divide"""
+    return round(part / total * 100, 2) if total > 0 else 0.0